@@ -0,0 +1,124 @@
+# 复用已构建的 LLM 客户端和 AgentExecutor，避免每个节点每次调用都重新构建
+import hashlib
+import threading
+from collections import OrderedDict
+from typing import Any, Callable, Hashable
+
+from langchain.chat_models import init_chat_model
+
+
+class LRUCache:
+    """
+    A small thread-safe LRU cache.
+
+    Attributes:
+        maxsize (int): Maximum number of entries kept before the least recently used one is evicted.
+        hits (int): Number of lookups served from the cache.
+        misses (int): Number of lookups that had to build a new value.
+    """
+
+    def __init__(self, maxsize: int = 32) -> None:
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._data: OrderedDict = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get_or_create(self, key: Hashable, factory: Callable[[], Any]) -> Any:
+        """
+        Return the cached value for key, building it with factory on a miss.
+        """
+        with self._lock:
+            if key in self._data:
+                self._data.move_to_end(key)
+                self.hits += 1
+                return self._data[key]
+            self.misses += 1
+            value = factory()
+            self._data[key] = value
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+            return value
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+
+_model_cache = LRUCache(maxsize=8)
+_executor_cache = LRUCache(maxsize=32)
+
+
+def _config_key(config: dict) -> tuple:
+    # api_key 只保留哈希值，避免把明文密钥放进缓存键
+    items = []
+    for name, value in sorted(config.items()):
+        if name == "api_key" and value:
+            value = hashlib.sha256(str(value).encode()).hexdigest()
+        items.append((name, str(value)))
+    return tuple(items)
+
+
+def _prompt_key(system_prompt: Any) -> str:
+    return hashlib.sha256(str(system_prompt).encode()).hexdigest()
+
+
+def get_chat_model(config: dict):
+    """
+    Return a chat model for the given config, shared across turns and sessions.
+
+    The same provider, model and API key reuse one client instance, and with it the
+    underlying HTTP connection pool.
+    """
+    return _model_cache.get_or_create(
+        _config_key(config), lambda: init_chat_model(**config)
+    )
+
+
+def get_agent_executor(
+    node_name: str,
+    config: dict,
+    tools: list,
+    system_prompt: Any,
+    builder: Callable,
+):
+    """
+    Return a cached AgentExecutor for a worker node.
+
+    Executors are keyed by (node, model config, tool set, prompt hash). Callbacks are
+    passed per invocation, so one executor can safely serve every session.
+
+    Args:
+        node_name (str): Name of the graph node owning the executor.
+        config (dict): Model config passed to init_chat_model.
+        tools (list): Tools bound to the agent.
+        system_prompt: System prompt of the agent.
+        builder (Callable): Called as builder(llm, tools, system_prompt) on a cache miss.
+
+    Returns:
+        AgentExecutor: The cached executor.
+    """
+    key = (
+        node_name,
+        _config_key(config),
+        tuple(sorted(tool.name for tool in tools)),
+        _prompt_key(system_prompt),
+    )
+    return _executor_cache.get_or_create(
+        key, lambda: builder(get_chat_model(config), tools, system_prompt)
+    )
+
+
+_chain_cache = LRUCache(maxsize=16)
+
+
+def get_chain(name: str, config: dict, builder: Callable):
+    """
+    Return a cached LCEL chain built as builder(llm) for the given model config.
+    """
+    return _chain_cache.get_or_create(
+        (name, _config_key(config)), lambda: builder(get_chat_model(config))
+    )
@@ -1,17 +1,34 @@
-from typing import Any, TypedDict
+import asyncio
+import os
+import threading
+from collections import ChainMap
+from functools import wraps
+from typing import Annotated, Any, Callable, TypedDict
 from langchain.agents import (
     AgentExecutor,
     create_openai_tools_agent,
 )
-from langchain.chat_models import init_chat_model
 from langchain_core.prompts import ChatPromptTemplate, MessagesPlaceholder
+from langchain_core.runnables import RunnableConfig, RunnableLambda
+from langchain_core.runnables.config import merge_configs
 from langchain_core.messages import BaseMessage, HumanMessage, AIMessage
 from langchain_openai import ChatOpenAI
 
 from langgraph.graph import StateGraph, END
+from langgraph.graph.message import add_messages
+from langgraph.types import Send
 from dotenv import load_dotenv
+from agent_pool import get_agent_executor, get_chain, get_chat_model
+from async_runtime import run_coroutine
+from checkpoint_store import get_checkpoint_store, get_checkpointer
 from chains import get_finish_chain, get_supervisor_chain
+from history import compact_for_node
+from intent import get_intents, latest_user_message
+from router import ROUTES, aroute_request
+from planner import PLANNING_MODE, get_plan, plan_depth, ready_tasks
+from resume_index import get_resume_index
 from tools import (
+    current_resume_path,
     get_job_search_tool,
     ResumeExtractorTool,
     generate_letter_for_specific_job,
@@ -28,6 +45,9 @@ from prompts import (
 
 load_dotenv()
 
+# 每次发送给 LLM 的简历内容上限（字符数），只发送与当前任务相关的段落
+RESUME_CONTEXT_CHARS = int(os.getenv("RESUME_CONTEXT_CHARS", "4000"))
+
 # 生成一个 LangChain Agent，绑定 LLM、工具和系统 Prompt。
 def create_agent(llm: ChatOpenAI, tools: list, system_prompt: str):
     """
@@ -57,85 +77,111 @@ def create_agent(llm: ChatOpenAI, tools: list, system_prompt: str):
     return executor
 
 # Supervisor 节点
-def supervisor_node(state):
-    new_state = state.copy()
+async def supervisor_node(state, config: RunnableConfig = None):
+    new_state = state_view(state)
+    callback, settings = node_context(config)
 
     # 初始化循环计数器
     if 'supervisor_count' not in new_state:
         new_state['supervisor_count'] = 0
     new_state['supervisor_count'] += 1
 
-    # 循环保护 - 超过2次强制结束
-    if new_state['supervisor_count'] > 2:
-        new_state["callback"].write_output("⚠️ 检测到可能循环，强制结束")
-        new_state["next_step"] = "Finish"
-        return new_state
-
     # 状态日志
-    new_state["callback"].write_output("--- Supervisor状态快照 ---")
-    new_state["callback"].write_output(f"消息数: {len(new_state.get('messages', []))}")
-    new_state["callback"].write_output(f"简历存在: {'resume_text' in new_state}")
-    new_state["callback"].write_output(f"简历提取失败: {new_state.get('resume_extraction_failed', False)}")
+    callback.write_debug("--- Supervisor状态快照 ---")
+    callback.write_debug("消息数: %s", len(new_state.get('messages', [])))
+    callback.write_debug("简历存在: %s", 'resume_text' in new_state)
+    callback.write_debug("简历提取失败: %s", new_state.get('resume_extraction_failed', False))
     if new_state.get('resume_extraction_failed', False):
-        new_state["callback"].write_output(f"简历提取错误: {new_state.get('resume_extraction_error', '未知错误')}")
-    new_state["callback"].write_output(f"循环计数: {new_state.get('supervisor_count', 0)}")
-    new_state["callback"].write_output("------------------------")
-
-    chat_history = new_state.get("messages", [])
-    if not chat_history and "user_input" in new_state:
-        chat_history.append(HumanMessage(new_state["user_input"]))
-
-    user_messages = [msg.content for msg in chat_history if isinstance(msg, HumanMessage)]
-    user_intent = " ".join(user_messages).lower()
+        callback.write_debug("简历提取错误: %s", new_state.get('resume_extraction_error', '未知错误'))
+    callback.write_debug("循环计数: %s", new_state.get('supervisor_count', 0))
+    callback.write_debug("------------------------")
+
+    if not new_state.get("messages") and "user_input" in new_state:
+        # 只写入视图，由 add_messages 追加到图状态中
+        new_state["messages"] = [HumanMessage(new_state["user_input"])]
+
+    # 规划模式：请求包含多个子任务时按 DAG 调度，没有依赖关系的 Agent 并行执行
+    plan = get_plan(new_state) if PLANNING_MODE else {}
+    ready = ready_tasks(new_state, plan) if plan else []
+    if plan and not ready:
+        # 计划中的任务都已完成，正常结束
+        callback.write_output(f"🗺️ 任务规划: {plan}，已全部完成")
+        new_state["next_step"] = "Finish"
+        return state_update(new_state)
 
-    # 关键逻辑：根据简历和用户意图选择下一步
-    if not new_state.get('resume_text') and not new_state.get('resume_extraction_failed', False):
-        # 用户要求生成求职信但没有简历
-        if any(k in user_intent for k in ["求职信", "cover letter", "生成信", "letter"]):
-            new_state["callback"].write_output("🔍 用户要求生成求职信，但简历不存在，先提取简历")
-            new_state["next_step"] = "ResumeAnalyzer"
-            return new_state
+    # 循环保护 - 超过2次（规划模式下为计划的轮数）强制结束
+    if new_state['supervisor_count'] > max(2, plan_depth(plan)):
+        callback.write_output("⚠️ 检测到可能循环，强制结束")
+        new_state["next_step"] = "Finish"
+        return state_update(new_state)
 
     # 简历提取失败
     if new_state.get('resume_extraction_failed', False):
         error_msg = new_state.get('resume_extraction_error', '未知错误')
-        new_state["callback"].write_output(f"⚠️ 简历提取失败，错误信息: {error_msg}")
+        callback.write_output(f"⚠️ 简历提取失败，错误信息: {error_msg}")
         new_state["next_step"] = "ChatBot"
-        return new_state
+        return state_update(new_state)
 
-    # 简历存在
-    if 'resume_text' in new_state and new_state['resume_text']:
-        job_info_exists = 'job_info' in new_state and new_state['job_info'] and len(new_state['job_info']) > 10
+    if plan:
+        callback.write_output(f"🗺️ 任务规划: {plan}，本轮执行: {ready}")
+        if len(ready) == 1:
+            new_state["next_step"] = ready[0]
+        else:
+            new_state["next_step"] = "Parallel"
+            new_state["dispatch"] = ready
+        return state_update(new_state)
+
+    # 混合路由：关键词 / 本地分类器 / LLM Supervisor，每条用户消息只路由一次
+    decision = await aroute_request(new_state, lambda: _llm_supervisor_route(new_state, config))
+    callback.write_output(
+        f"🧭 路由: {decision.route}（{decision.source}，{decision.latency_ms:.2f} ms）"
+    )
+    route = decision.route if decision.route in ROUTES else "ChatBot"
 
-        if any(k in user_intent for k in ["求职信", "cover letter", "生成信"]):
-            if job_info_exists:
-                new_state["callback"].write_output("✅ 简历和职位信息都存在，转向CoverLetterGenerator")
-                new_state["next_step"] = "CoverLetterGenerator"
-            else:
-                new_state["callback"].write_output("⚠️ 用户要求生成求职信，但缺少职位信息，转向JobSearcher")
-                new_state["next_step"] = "JobSearcher"
-        elif any(k in user_intent for k in ["职位", "工作", "job", "search"]):
-            new_state["next_step"] = "JobSearcher"
-        elif any(k in user_intent for k in ["研究", "调研", "research"]):
-            new_state["next_step"] = "WebResearcher"
+    # 关键逻辑：根据简历和职位信息修正路由
+    resume_exists = bool(new_state.get('resume_text'))
+    if route == "CoverLetterGenerator":
+        job_info_exists = 'job_info' in new_state and new_state['job_info'] and len(new_state['job_info']) > 10
+        if not resume_exists:
+            callback.write_output("🔍 用户要求生成求职信，但简历不存在，先提取简历")
+            route = "ResumeAnalyzer"
+        elif job_info_exists:
+            callback.write_output("✅ 简历和职位信息都存在，转向CoverLetterGenerator")
         else:
-            new_state["next_step"] = "ChatBot"
+            callback.write_output("⚠️ 用户要求生成求职信，但缺少职位信息，转向JobSearcher")
+            route = "JobSearcher"
+    elif route == "ResumeAnalyzer" and resume_exists:
+        # 简历已提取，由 ChatBot 基于已提取的内容回答
+        route = "ChatBot"
+
+    # 该 Agent 已经回复过本条用户消息，直接结束，避免重复执行
+    turn_start = latest_user_message(new_state["messages"]) or 0
+    if any(getattr(msg, "name", None) == route for msg in new_state["messages"][turn_start:]):
+        new_state["next_step"] = "Finish"
+        return state_update(new_state)
 
-        return new_state
+    new_state["next_step"] = route
+    return state_update(new_state)
 
-    # 如果简历不存在且用户没有明确求职信意图，默认进入 ChatBot
-    new_state["next_step"] = "ChatBot"
-    return new_state
+async def _llm_supervisor_route(state, config: RunnableConfig = None) -> str:
+    callback, settings = node_context(config)
+    supervisor_chain = get_chain("Supervisor", settings, get_supervisor_chain)
+    result = await supervisor_chain.ainvoke(
+        {"messages": compact_for_node(state, "Supervisor")},
+        merge_configs(config, {"callbacks": [callback]}),
+    )
+    return result.next_action
 
 # ChatBot 节点
-def chatbot_node(state):
-    new_state = state.copy()
-    llm = init_chat_model(**new_state["config"])
-    new_state["callback"].write_agent_name("ChatBot Agent 🤖")
+async def chatbot_node(state, config: RunnableConfig = None):
+    new_state = state_view(state)
+    callback, settings = node_context(config)
+    llm = get_chat_model(settings)
+    callback.write_agent_name("ChatBot Agent 🤖")
 
     # ✅ Comprehensive state diagnostics
-    new_state["callback"].write_output("=== Comprehensive State Diagnostics ===")
-    new_state["callback"].write_output(f"All state keys: {list(state.keys())}")
+    callback.write_debug("=== Comprehensive State Diagnostics ===")
+    callback.write_debug("All state keys: %s", list(state.keys()))
 
     # ✅ Check resume content - multiple verification methods
     resume_text = ""
@@ -145,8 +191,8 @@ def chatbot_node(state):
     if 'resume_text' in state and state['resume_text'] and len(str(state['resume_text']).strip()) > 10:
         resume_text = str(state['resume_text'])
         resume_available = True
-        new_state["callback"].write_output(
-            f"✅ Method 1: Resume content confirmed - Length: {len(resume_text)} characters")
+        callback.write_debug(
+            "✅ Method 1: Resume content confirmed - Length: %s characters", len(resume_text))
 
     # Method 2: Check message history for resume content
     if not resume_available:
@@ -155,47 +201,48 @@ def chatbot_node(state):
                 if len(msg.content) > 50:  # Likely resume content
                     resume_text = msg.content
                     resume_available = True
-                    new_state["callback"].write_output(f"✅ Method 2: Found resume content in message history")
+                    callback.write_debug("✅ Method 2: Found resume content in message history")
                     break
 
     if resume_available:
-        new_state["callback"].write_output(f"📄 Resume preview: {resume_text[:300]}...")
+        callback.write_debug("📄 Resume preview: %s...", resume_text[:300])
     else:
-        new_state["callback"].write_output("❌ No valid resume content found through any method")
+        callback.write_debug("❌ No valid resume content found through any method")
 
     # ✅ Analyze user intent
-    user_intent = ""
-    for msg in state.get("messages", []):
-        if isinstance(msg, HumanMessage):
-            user_intent += " " + msg.content
-    user_intent = user_intent.strip().lower()
+    intents = get_intents(new_state)
 
-    new_state["callback"].write_output(f"🔍 User intent: '{user_intent}'")
+    callback.write_debug("🔍 User intent: %s", sorted(intents))
 
     # ✅ Detect summary request
-    needs_summary = any(keyword in user_intent for keyword in
-                        ["summarize", "summary", "summarise", "brief", "overview"])
+    needs_summary = "summary" in intents
 
     # ✅ Core fix: If summary requested but resume unavailable
     if needs_summary and not resume_available:
-        new_state["callback"].write_output("⚠️ User requested summary but resume unavailable")
+        callback.write_output("⚠️ User requested summary but resume unavailable")
         answer = "I understand you want a resume summary, but no valid resume content was detected in the system.\n\nPlease upload your resume file first, then I can generate a professional summary for you."
-        new_state["messages"].append(AIMessage(content=answer, name="ChatBot"))
         new_state["next_step"] = "Supervisor"
-        return new_state
+        return state_update(new_state, messages=[AIMessage(content=answer, name="ChatBot")])
 
     # ✅ Core fix: If summary requested and resume available
     if needs_summary and resume_available:
-        new_state["callback"].write_output("🎯 Starting robust resume summary...")
+        callback.write_output("🎯 Starting robust resume summary...")
 
         try:
+            # 摘要只需要基本信息、经历、教育、技能和证书这几个段落
+            resume_index = await asyncio.to_thread(get_resume_index, resume_text)
+            resume_context = resume_index.render_sections(
+                ["header", "summary", "experience", "education", "skills", "certifications"],
+                max_chars=RESUME_CONTEXT_CHARS,
+            ) or resume_text[:RESUME_CONTEXT_CHARS]
+
             # ✅ Use explicit, forceful prompt in English
             forceful_prompt = f"""
-            Here is the user's resume content, provided in full. Generate a summary based on this exact content. 
+            Here is the user's resume content, organized by section. Generate a summary based on this exact content. 
             Do NOT ask for more information or claim the content is missing.
 
             === RESUME CONTENT STARTS ===
-            {resume_text}
+            {resume_context}
             === RESUME CONTENT ENDS ===
 
             TASK: Generate a structured resume summary containing:
@@ -213,14 +260,14 @@ def chatbot_node(state):
             - Keep the summary concise but comprehensive
             """
 
-            new_state["callback"].write_output("🔍 Sending forceful prompt to LLM...")
-            response = llm.invoke(forceful_prompt)
+            callback.write_debug("🔍 Sending forceful prompt to LLM...")
+            response = await llm.ainvoke(forceful_prompt, config)
             summary = response.content
 
             # ✅ Check if LLM still claims content is missing
             if any(phrase in summary.lower() for phrase in
                    ["don't see", "not provided", "not found", "please provide", "please share", "unable to find"]):
-                new_state["callback"].write_output("⚠️ LLM still claims content missing, using fallback solution...")
+                callback.write_output("⚠️ LLM still claims content missing, using fallback solution...")
 
                 # Fallback solution: Generate deterministic response
                 summary = f"""
@@ -240,48 +287,50 @@ def chatbot_node(state):
                 """
 
             answer = summary
-            new_state["callback"].write_output("✅ Resume summary generation completed")
+            callback.write_output("✅ Resume summary generation completed")
 
         except Exception as e:
-            new_state["callback"].write_output(f"❌ Summary generation error: {str(e)}")
+            callback.write_output(f"❌ Summary generation error: {str(e)}", level="error")
             answer = f"Error generating resume summary: {str(e)}"
 
-        new_state["messages"].append(AIMessage(content=answer, name="ChatBot"))
         new_state["next_step"] = "Supervisor"
-        return new_state
+        return state_update(new_state, messages=[AIMessage(content=answer, name="ChatBot")])
 
     # ✅ Normal chat handling
     try:
         finish_chain = get_finish_chain(llm)
-        output = finish_chain.invoke({"messages": state["messages"]})
+        output = await finish_chain.ainvoke({"messages": compact_for_node(new_state, "ChatBot")}, config)
         answer = output.content
     except Exception as e:
         answer = f"Error processing your message: {str(e)}"
 
-    new_state["messages"].append(AIMessage(content=answer, name="ChatBot"))
     new_state["next_step"] = "Supervisor"
-    return new_state
+    return state_update(new_state, messages=[AIMessage(content=answer, name="ChatBot")])
 
 # 使用 JobSearchTool 在 LinkedIn 等网站搜索职位
-def job_search_node(state):
+async def job_search_node(state, config: RunnableConfig = None):
     """
     This Node is responsible for searching for jobs from linkedin or any other job search engine.
     Tools: Job Search Tool
     """
-    # 创建新状态副本
-    new_state = state.copy()
-
-    llm = init_chat_model(**new_state["config"])
-    search_agent = create_agent(
-        llm, [get_job_search_tool()], get_search_agent_prompt_template()
+    # 写时复制的状态视图，只返回本节点修改的键
+    new_state = state_view(state)
+    callback, settings = node_context(config)
+
+    search_agent = get_agent_executor(
+        "JobSearcher",
+        settings,
+        [get_job_search_tool()],
+        get_search_agent_prompt_template(),
+        create_agent,
     )
 
-    new_state["callback"].write_agent_name("JobSearcher Agent 💼")
+    callback.write_agent_name("JobSearcher Agent 💼")
 
     try:
-        output = search_agent.invoke(
-            {"messages": new_state["messages"]},
-            {"callbacks": [new_state["callback"]]}
+        output = await search_agent.ainvoke(
+            {"messages": compact_for_node(new_state, "JobSearcher")},
+            merge_configs(config, {"callbacks": [callback]})
         )
 
         # ✅ 关键修复：提取并保存职位信息到状态
@@ -290,55 +339,61 @@ def job_search_node(state):
         if job_info and "没有找到" not in job_info and "未找到" not in job_info:
             # 保存职位信息到状态
             new_state["job_info"] = job_info
-            new_state["callback"].write_output(f"✅ 成功获取职位信息并保存到状态")
-            new_state["callback"].write_output(f"📋 职位信息: {job_info[:200]}...")
+            callback.write_output(f"✅ 成功获取职位信息并保存到状态")
+            callback.write_debug("📋 职位信息: %s...", job_info[:200])
         else:
-            new_state["callback"].write_output("❌ 未找到相关职位信息")
+            callback.write_output("❌ 未找到相关职位信息")
             new_state["job_info"] = "未找到相关职位信息"
 
-        new_state["messages"].append(
-            HumanMessage(content=job_info, name="JobSearcher")
-        )
+        reply = HumanMessage(content=job_info, name="JobSearcher")
 
     except Exception as e:
-        new_state["callback"].write_output(f"❌ JobSearcher错误: {e}")
-        new_state["messages"].append(
-            HumanMessage(content=f"职位搜索失败: {str(e)}", name="JobSearcher")
-        )
+        callback.write_output(f"❌ JobSearcher错误: {e}", level="error")
+        reply = HumanMessage(content=f"职位搜索失败: {str(e)}", name="JobSearcher")
         new_state["job_info"] = f"搜索失败: {str(e)}"
 
     # 确保设置下一步为Supervisor
     new_state["next_step"] = "Supervisor"
-    return new_state
+    return state_update(new_state, messages=[reply])
 
 # 解析上传的简历 PDF 或消息内容
-def resume_analyzer_node(state):
-    # 创建新状态副本
-    new_state = state.copy()
-
-    llm = init_chat_model(**new_state["config"])
-    analyzer_agent = create_agent(
-        llm, [ResumeExtractorTool()], get_analyzer_agent_prompt_template()
+async def resume_analyzer_node(state, config: RunnableConfig = None):
+    # 写时复制的状态视图，只返回本节点修改的键
+    new_state = state_view(state)
+    callback, settings = node_context(config)
+
+    analyzer_agent = get_agent_executor(
+        "ResumeAnalyzer",
+        settings,
+        [ResumeExtractorTool()],
+        get_analyzer_agent_prompt_template(),
+        create_agent,
     )
 
-    new_state["callback"].write_agent_name("ResumeAnalyzer Agent 📄")
+    callback.write_agent_name("ResumeAnalyzer Agent 📄")
 
     # ✅ 添加详细的调试信息
-    new_state["callback"].write_output(f"🔍 ResumeAnalyzer输入消息: {[msg.content for msg in new_state['messages']]}")
+    if callback.is_enabled("debug"):
+        callback.write_debug("🔍 ResumeAnalyzer输入消息: %s", [msg.content for msg in new_state['messages']])
 
     # ✅ 检查是否有文件路径信息
-    if 'file_path' in new_state:
-        new_state["callback"].write_output(f"🔍 检测到文件路径: {new_state['file_path']}")
+    if new_state.get("resume_path"):
+        callback.write_debug("🔍 检测到文件路径: %s", new_state['resume_path'])
     else:
-        new_state["callback"].write_output("🔍 未检测到文件路径，检查消息中是否包含文件信息")
+        callback.write_debug("🔍 未检测到文件路径，检查消息中是否包含文件信息")
 
-    output = analyzer_agent.invoke(
-        {"messages": new_state["messages"]},
-        {"callbacks": [new_state["callback"]]},
-    )
+    # 执行器是共享的，通过 ContextVar 把本会话的简历路径传给 ResumeExtractorTool
+    token = current_resume_path.set(new_state.get("resume_path"))
+    try:
+        output = await analyzer_agent.ainvoke(
+            {"messages": compact_for_node(new_state, "ResumeAnalyzer")},
+            merge_configs(config, {"callbacks": [callback]}),
+        )
+    finally:
+        current_resume_path.reset(token)
 
     raw_output = output.get("output", "")
-    new_state["callback"].write_output(f"🧾 ResumeAnalyzer 原始输出:\n{raw_output}")
+    callback.write_debug("🧾 ResumeAnalyzer 原始输出:\n%s", raw_output)
 
     resume_text = None
     if isinstance(raw_output, dict) and "resume_text" in raw_output:
@@ -361,144 +416,152 @@ def resume_analyzer_node(state):
             len(str(resume_text).strip()) > 50):  # 确保有实际内容
 
         new_state["resume_text"] = resume_text
-        new_state["callback"].write_output(f"✅ 成功提取简历内容 (长度: {len(resume_text)} 字符)")
+        callback.write_output(f"✅ 成功提取简历内容 (长度: {len(resume_text)} 字符)")
+        # 每份简历只构建一次索引，后续节点直接检索
+        resume_index = await asyncio.to_thread(get_resume_index, resume_text)
+        callback.write_debug("🗂️ 简历索引: %s，%s 个分块", list(resume_index.sections), len(resume_index.chunks))
         message_content = f"简历提取成功！共{len(resume_text)}字符。"
         # 清除提取失败标志
-        if "resume_extraction_failed" in new_state:
-            del new_state["resume_extraction_failed"]
+        if new_state.get("resume_extraction_failed"):
+            new_state["resume_extraction_failed"] = False
     else:
-        new_state["callback"].write_output(f"❌ 简历提取失败: {resume_text}")
+        callback.write_output(f"❌ 简历提取失败: {resume_text}", level="error")
         message_content = f"简历提取失败: {resume_text}"
         # 设置提取失败标志
         new_state["resume_extraction_failed"] = True
         new_state["resume_extraction_error"] = str(resume_text)
 
-    # 更新消息历史
-    new_state["messages"].append(HumanMessage(content=message_content, name="ResumeAnalyzer"))
-
-    # 明确设置next_step并返回完整状态
+    # 明确设置next_step，只返回本节点的更新和新增的消息
     new_state["next_step"] = "Supervisor"
-    new_state["callback"].write_output(f"🔍 ResumeAnalyzer结束 - 设置的next_step: {new_state['next_step']}")
+    callback.write_debug("🔍 ResumeAnalyzer结束 - 设置的next_step: %s", new_state['next_step'])
 
-    return new_state
+    return state_update(
+        new_state, messages=[HumanMessage(content=message_content, name="ResumeAnalyzer")]
+    )
 
 # 使用简历和职位信息生成求职信
-def cover_letter_generator_node(state):
+async def cover_letter_generator_node(state, config: RunnableConfig = None):
     """
     Node which handles the generation of cover letters.
     Tools: Cover Letter Generator, Cover Letter Saver
     """
-    # 创建新状态副本
-    new_state = state.copy()
+    # 写时复制的状态视图，只返回本节点修改的键
+    new_state = state_view(state)
+    callback, settings = node_context(config)
 
     # ✅ 添加详细的调试信息
-    new_state["callback"].write_output(f"🔍 CoverLetterGenerator开始 - 简历存在: {'resume_text' in new_state}")
-    new_state["callback"].write_output(f"🔍 CoverLetterGenerator开始 - 职位信息存在: {'job_info' in new_state}")
+    callback.write_debug("🔍 CoverLetterGenerator开始 - 简历存在: %s", 'resume_text' in new_state)
+    callback.write_debug("🔍 CoverLetterGenerator开始 - 职位信息存在: %s", 'job_info' in new_state)
 
     if 'resume_text' in new_state:
-        new_state["callback"].write_output(f"🔍 简历长度: {len(new_state['resume_text'])}")
+        callback.write_debug("🔍 简历长度: %s", len(new_state['resume_text']))
     if 'job_info' in new_state:
-        new_state["callback"].write_output(f"🔍 职位信息: {new_state['job_info'][:200]}...")
-
-    llm = init_chat_model(**new_state["config"])
+        callback.write_debug("🔍 职位信息: %s...", new_state['job_info'][:200])
 
     # ✅ 确保简历和职位信息都存在
     if 'resume_text' not in new_state or not new_state['resume_text']:
-        new_state["callback"].write_output("❌ 简历不存在，无法生成求职信")
-        new_state["messages"].append(HumanMessage(content="简历不存在，无法生成求职信", name="CoverLetterGenerator"))
+        callback.write_output("❌ 简历不存在，无法生成求职信", level="error")
         new_state["next_step"] = "Supervisor"
-        return new_state
+        return state_update(
+            new_state, messages=[HumanMessage(content="简历不存在，无法生成求职信", name="CoverLetterGenerator")]
+        )
 
     if 'job_info' not in new_state or not new_state['job_info']:
-        new_state["callback"].write_output("❌ 职位信息不存在，无法生成求职信")
-        new_state["messages"].append(HumanMessage(content="需要职位信息才能生成求职信", name="CoverLetterGenerator"))
+        callback.write_output("❌ 职位信息不存在，无法生成求职信", level="error")
         new_state["next_step"] = "JobSearcher"
-        return new_state
+        return state_update(
+            new_state, messages=[HumanMessage(content="需要职位信息才能生成求职信", name="CoverLetterGenerator")]
+        )
 
     # ✅ 创建包含简历和职位信息的输入
+    # 只检索与职位信息最相关的简历片段（联系方式总是保留），不再发送整份简历
+    # 建索引和向量检索是 CPU 计算，放到线程里执行，避免阻塞事件循环
+    resume_index = await asyncio.to_thread(get_resume_index, new_state["resume_text"])
+    resume_context = await asyncio.to_thread(
+        resume_index.retrieve,
+        new_state["job_info"],
+        k=8,
+        max_chars=RESUME_CONTEXT_CHARS,
+        always=["header"],
+        contact=True,
+    ) or new_state["resume_text"][:RESUME_CONTEXT_CHARS]
+
     # 构建包含所有必要信息的消息
-    enhanced_messages = new_state["messages"] + [
+    enhanced_messages = compact_for_node(new_state, "CoverLetterGenerator") + [
         HumanMessage(
-            content=f"基于以下信息生成求职信：\n\n简历内容：{new_state['resume_text']}\n\n职位信息：{new_state['job_info']}")
+            content=f"基于以下信息生成求职信：\n\n简历内容：{resume_context}\n\n职位信息：{new_state['job_info']}")
     ]
 
     input_data = {
         "messages": enhanced_messages,
-        "resume_text": new_state["resume_text"],
+        "resume_text": resume_context,
         "job_info": new_state["job_info"]
     }
 
     # ✅ 使用正确的工具创建代理
     tools = [generate_letter_for_specific_job]
 
-    generator_agent = create_agent(
-        llm,
+    generator_agent = get_agent_executor(
+        "CoverLetterGenerator",
+        settings,
         tools,
         get_generator_agent_prompt_template(),
+        create_agent,
     )
 
-    new_state["callback"].write_agent_name("CoverLetterGenerator Agent ✍️")
+    callback.write_agent_name("CoverLetterGenerator Agent ✍️")
 
     try:
-        new_state["callback"].write_output("🔍 开始生成求职信...")
-        new_state["callback"].write_output(f"🔍 输入数据预览 - 简历: {new_state['resume_text'][:100]}...")
-        new_state["callback"].write_output(f"🔍 输入数据预览 - 职位: {new_state['job_info'][:100]}...")
+        callback.write_output("🔍 开始生成求职信...")
+        callback.write_debug("🔍 输入数据预览 - 简历: %s...", new_state['resume_text'][:100])
+        callback.write_debug("🔍 输入数据预览 - 职位: %s...", new_state['job_info'][:100])
 
-        output = generator_agent.invoke(
+        output = await generator_agent.ainvoke(
             input_data,
-            {"callbacks": [new_state["callback"]]}
+            merge_configs(config, {"callbacks": [callback]})
         )
 
         # ✅ 处理输出
         output_content = output.get("output", "")
-        new_state["callback"].write_output(f"✅ 求职信生成完成")
-        new_state["callback"].write_output(f"📄 求职信内容: {output_content[:200]}...")
+        callback.write_output(f"✅ 求职信生成完成")
+        callback.write_debug("📄 求职信内容: %s...", output_content[:200])
 
         # ✅ 保存求职信到状态
         new_state["cover_letter"] = output_content
 
-        new_state["messages"].append(
-            HumanMessage(
-                content=output_content,
-                name="CoverLetterGenerator",
-            )
+        reply = HumanMessage(
+            content=output_content,
+            name="CoverLetterGenerator",
         )
 
     except Exception as e:
-        new_state["callback"].write_output(f"❌ CoverLetterGenerator错误: {e}")
-        new_state["messages"].append(
-            HumanMessage(
-                content=f"生成求职信时出错: {str(e)}",
-                name="CoverLetterGenerator",
-            )
-        )
+        # 不吞掉异常：本轮停在检查点上，用户重发同一条消息时只重新执行求职信，不再重复搜索职位
+        callback.write_output(f"❌ CoverLetterGenerator错误: {e}", level="error")
+        raise
 
     # 确保设置下一步为Supervisor
     new_state["next_step"] = "Supervisor"
-    return new_state
+    return state_update(new_state, messages=[reply])
 
 # 使用 Google 搜索和网页爬取工具，完成用户的调研请求
-def web_research_node(state):
-    new_state = state.copy()
-    llm = init_chat_model(**new_state["config"])
-
-    # 确保返回的是 ChatPromptTemplate 对象
-    prompt_template = researcher_agent_prompt_template()
-    if isinstance(prompt_template, str):
-        from langchain_core.prompts import ChatPromptTemplate
-        prompt_template = ChatPromptTemplate.from_messages([("system", prompt_template)])
-
-    research_agent = create_agent(
-        llm,
-        [get_google_search_results(), scrape_website()],  # ⚠️ 调用工具构造函数
-        prompt_template
+async def web_research_node(state, config: RunnableConfig = None):
+    new_state = state_view(state)
+    callback, settings = node_context(config)
+
+    # create_agent 会把系统提示词包装进 ChatPromptTemplate，这里直接传字符串
+    research_agent = get_agent_executor(
+        "WebResearcher",
+        settings,
+        [get_google_search_results, scrape_website],
+        researcher_agent_prompt_template(),
+        create_agent,
     )
 
-    new_state["callback"].write_agent_name("WebResearcher Agent 🔍")
+    callback.write_agent_name("WebResearcher Agent 🔍")
     try:
-        output = research_agent.invoke(
-            {"messages": new_state["messages"]},
-            {"callbacks": [new_state["callback"]]}
+        output = await research_agent.ainvoke(
+            {"messages": compact_for_node(new_state, "WebResearcher")},
+            merge_configs(config, {"callbacks": [callback]})
         )
 
         # 统一处理输出
@@ -510,23 +573,23 @@ def web_research_node(state):
         else:
             content = str(output)
 
-        new_state["messages"].append(HumanMessage(content=content, name="WebResearcher"))
-        new_state["callback"].write_output(f"✅ WebResearcher完成，内容预览: {content[:200]}...")
+        reply = HumanMessage(content=content, name="WebResearcher")
+        callback.write_output(f"✅ WebResearcher完成，内容预览: {content[:200]}...")
 
     except Exception as e:
         error_msg = f"❌ WebResearcher失败: {str(e)}"
-        new_state["messages"].append(HumanMessage(content=error_msg, name="WebResearcher"))
-        new_state["callback"].write_output(error_msg)
+        reply = HumanMessage(content=error_msg, name="WebResearcher")
+        callback.write_output(error_msg, level="error")
 
     new_state["next_step"] = "Supervisor"
-    return new_state
+    return state_update(new_state, messages=[reply])
 
 
 # def chatbot_node(state):
 #     # 创建新状态副本
 #     new_state = state.copy()
 #
-#     llm = init_chat_model(**new_state["config"])
+#     llm = get_chat_model(new_state["config"])
 #     finish_chain = get_finish_chain(llm)
 #     new_state["callback"].write_agent_name("ChatBot Agent 🤖")
 #     output = finish_chain.invoke({"messages": new_state["messages"]})
@@ -536,6 +599,54 @@ def web_research_node(state):
 #     new_state["next_step"] = "Supervisor"
 #     return new_state
 
+def node_context(config: RunnableConfig) -> tuple:
+    """
+    Return the (callback handler, model settings) of the current run.
+
+    Both are passed per run in config["configurable"] rather than in the state, so
+    they are never written to a checkpoint (the settings hold API keys) and a resumed
+    run reports to the current page.
+    """
+    configurable = (config or {}).get("configurable", {})
+    return configurable["callback"], configurable["settings"]
+
+
+def state_view(state) -> ChainMap:
+    """
+    Return a copy-on-write view of the graph state for a node.
+
+    Reads fall through to the state LangGraph passed in; writes (including the
+    intent/route/plan/history caches the helpers keep in the state) land in the
+    view's own dict, so nothing is copied and the shared state is never mutated.
+    """
+    return ChainMap({}, state)
+
+
+def state_update(view: ChainMap, **changes) -> dict:
+    """
+    Return a node's partial update: the keys written to its view plus `changes`.
+
+    New messages are passed as `messages=[...]`; the add_messages reducer appends them.
+    """
+    return {**view.maps[0], **changes}
+
+
+def as_graph_node(node: Callable) -> RunnableLambda:
+    """
+    Wrap an async node so it runs natively under graph.ainvoke/astream, while
+    graph.invoke runs the same coroutine on the shared background event loop.
+    """
+    @wraps(node)
+    async def arun(state, config: RunnableConfig = None):
+        # config 中带有 LangGraph 的回调（用于 stream_mode="messages"），需要传给节点内的 LLM 调用
+        return await node(state, config)
+
+    def run(state, config: RunnableConfig = None):
+        return run_coroutine(arun(state, config))
+
+    return RunnableLambda(run, afunc=arun, name=node.__name__)
+
+
 # 定义整个工作流图
 def define_graph():
     workflow = StateGraph(AgentState)
@@ -551,7 +662,7 @@ def define_graph():
     }
 
     for name, func in nodes.items():
-        workflow.add_node(name, func)
+        workflow.add_node(name, as_graph_node(func))
 
     workflow.set_entry_point("Supervisor")
 
@@ -569,27 +680,157 @@ def define_graph():
         "finish": END,
     }
 
-    def supervisor_condition(state):
+    def supervisor_condition(state, config: RunnableConfig):
         next_step = state.get("next_step", "finish").lower()
-        state["callback"].write_output(f"🔀 Supervisor条件边决策: {next_step}")
+        callback, _ = node_context(config)
+        callback.write_debug("🔀 Supervisor条件边决策: %s", next_step)
+        if next_step == "parallel":
+            # 同一步内并行执行所有就绪的 Agent，完成后一起回到 Supervisor
+            return [Send(name, state) for name in state["dispatch"]]
         return next_step
 
     workflow.add_conditional_edges("Supervisor", supervisor_condition, conditional_map)
 
-    graph = workflow.compile()
+    # 每一步后的状态按会话 thread_id 写入 SQLite，失败后可从最后完成的节点继续
+    graph = workflow.compile(checkpointer=get_checkpointer())
     graph.recursion_limit = 100
     return graph
 
-# 定义状态字典结构，所有节点共享
+# 图结构版本号：修改节点或边后递增，使注册表中的旧编译结果失效
+GRAPH_VERSION = "5"
+
+# 进程级编译图注册表，所有 Streamlit 会话共享
+_graph_registry: dict = {}
+_graph_registry_lock = threading.Lock()
+
+
+def get_compiled_graph(builder: Callable = None, version: str = GRAPH_VERSION):
+    """
+    Returns the compiled graph for the given definition, compiling it at most once per process.
+
+    Streamlit re-executes app.py on every rerun, but imported modules stay loaded, so this
+    registry survives reruns and is shared by every session. A compiled graph keeps no
+    per-run state (each invoke gets its own channels), so the same instance can be
+    invoked concurrently from multiple sessions.
+
+    Args:
+        builder (Callable): Function that builds and compiles the graph. Defaults to define_graph.
+        version (str): Version of the graph definition, part of the registry key.
+
+    Returns:
+        CompiledGraph: The shared compiled graph.
+    """
+    builder = builder or define_graph
+    key = (builder.__module__, builder.__qualname__, version)
+    graph = _graph_registry.get(key)
+    if graph is None:
+        with _graph_registry_lock:
+            # 双重检查，避免多个会话同时首次编译
+            graph = _graph_registry.get(key)
+            if graph is None:
+                graph = builder()
+                _graph_registry[key] = graph
+    return graph
+
+def merge_dicts(left: dict, right: dict) -> dict:
+    return {**(left or {}), **(right or {})}
+
+
+def keep_last(left: Any, right: Any) -> Any:
+    return right
+
+
+# 定义状态字典结构，所有节点共享；节点只返回修改过的键，带 reducer 的键可以由并行分支同时写入
 class AgentState(TypedDict):
     user_input: str
-    messages: list[BaseMessage]
-    next_step: str
-    config: dict
-    callback: Any
-    resume_text: str
-    cover_letter: str
+    messages: Annotated[list[BaseMessage], add_messages]
+    next_step: Annotated[str, keep_last]
+    dispatch: list  # 本轮并行执行的 Agent
+    plan: dict  # 最新用户消息的任务 DAG
+    resume_path: str  # 本会话上传的简历文件路径
+    resume_text: Annotated[str, keep_last]
+    cover_letter: Annotated[str, keep_last]
     supervisor_count: int
     resume_extraction_failed: bool
-    job_info: str  # 职位信息
+    resume_extraction_error: str
+    job_info: Annotated[str, keep_last]  # 职位信息
+    history_summary: Annotated[dict, merge_dicts]  # 各节点的滚动历史摘要
+    intent: dict  # 最新用户消息的意图识别缓存
+    route: dict  # 最新用户消息的路由决策缓存
     chatbot_count: int  # ChatBot循环计数器
+
+
+def thread_config(thread_id: str, callback: Any, settings: dict, recursion_limit: int = 30) -> RunnableConfig:
+    """
+    Returns the run config of a session: its checkpoint thread plus the per-run callback and settings.
+
+    `thread_id` must be generated on the server (e.g. kept in the session state), never
+    taken from the request, otherwise anyone holding it could read or resume the thread.
+    GRAPH_VERSION is appended, so checkpoints of an older graph definition are never
+    resumed with nodes that no longer exist.
+    """
+    return {
+        "recursion_limit": recursion_limit,
+        "configurable": {
+            "thread_id": f"{thread_id}:v{GRAPH_VERSION}",
+            "callback": callback,
+            "settings": settings,
+        },
+    }
+
+
+async def aprepare_turn(graph, config: RunnableConfig, user_input: str, history, resume_path: str = None):
+    """
+    Returns the graph input for a user message on the session's thread, or None to resume.
+
+    If the previous run on the thread stopped with pending nodes (it failed) and the
+    same message is sent again, None is returned and graph.astream(None, config)
+    continues after the last completed node instead of starting over. Otherwise only
+    the new message and the per-turn keys are sent; resume_text, job_info and the
+    message history come from the checkpoint.
+
+    Args:
+        graph: Compiled graph with a checkpointer.
+        config (RunnableConfig): Config from thread_config.
+        user_input (str): The new user message.
+        history (BaseChatMessageHistory): Chat history, only read to seed a thread without a checkpoint.
+        resume_path (str): Resume file uploaded in this session.
+    """
+    await get_checkpoint_store().atouch(config["configurable"]["thread_id"])
+    snapshot = await graph.aget_state(config)
+    values = snapshot.values or {}
+    if snapshot.next and values.get("user_input") == user_input:
+        return None
+
+    message = HumanMessage(content=user_input)
+    turn = {
+        "messages": [message] if values.get("messages") else list(history.messages) + [message],
+        "user_input": user_input,
+        "resume_path": resume_path,
+        # 每轮重新计数，提取失败也只影响当轮
+        "supervisor_count": 0,
+        "resume_extraction_failed": False,
+    }
+    if values.get("resume_text") and values.get("resume_path") != resume_path:
+        # 上传了新的简历，旧的提取结果作废
+        turn["resume_text"] = ""
+    return turn
+
+
+async def aend_turn(config: RunnableConfig) -> None:
+    """
+    Drops the intermediate checkpoints of a completed turn; only the latest state is kept.
+
+    Failures are only logged: the turn itself already succeeded.
+    """
+    try:
+        await get_checkpoint_store().acompact(config["configurable"]["thread_id"])
+    except Exception as exc:
+        print(f"Failed to compact graph checkpoints -> {exc}")
+
+
+async def areset_thread(config: RunnableConfig) -> None:
+    """
+    Deletes every checkpoint of the session's thread, e.g. when the chat is cleared.
+    """
+    await get_checkpoint_store().adelete(config["configurable"]["thread_id"])
@@ -1,18 +1,20 @@
-from typing import Callable, TypeVar
 import os
-import inspect
 import shutil
+import uuid
 import streamlit as st
 import streamlit_analytics2 as streamlit_analytics
 from dotenv import load_dotenv
 from streamlit_chat import message
 from streamlit_pills import pills
-from streamlit.runtime.scriptrunner import add_script_run_ctx, get_script_run_ctx
 from streamlit.delta_generator import DeltaGenerator
 from langchain_community.chat_message_histories import StreamlitChatMessageHistory
-from langchain.schema import HumanMessage
 from custom_callback_handler import CustomStreamlitCallbackHandler
-from agents import define_graph
+from agents import aend_turn, aprepare_turn, areset_thread, get_compiled_graph, thread_config
+from async_runtime import iterate_async, run_coroutine
+from stream_renderer import TokenStreamRenderer, get_stream_metrics
+from upload_store import get_upload_store
+from message_store import chat_session_id, create_message_history
+from router import PRESET_ROUTES
 # load_dotenv()
 
 # ----------------- Set environment variables from Streamlit secrets or .env -----------------
@@ -100,14 +102,23 @@ uploaded_document = st.sidebar.file_uploader("Upload Your Resume", type="pdf")
 if not os.path.exists(temp_dir):
     os.makedirs(temp_dir)
 
-# 确定 resume 文件路径
-filepath = os.path.join(temp_dir, "resume.pdf")
+# 按内容寻址存储上传的简历（temp/<sha256>.pdf），各会话互不覆盖，相同文件只存一份
+upload_store = get_upload_store()
 
 if uploaded_document is not None:
-    # 用户上传了新文件 -> 覆盖 temp/resume.pdf
-    bytes_data = uploaded_document.read()
-    with open(filepath, "wb") as f:
-        f.write(bytes_data)
+    # 同一个上传文件在 rerun 时不再重复哈希和写盘，只刷新租约
+    if st.session_state.get("uploaded_file_id") != uploaded_document.file_id:
+        handle = upload_store.put(uploaded_document.getvalue())
+        upload_store.acquire(handle)
+        previous_handle = st.session_state.get("resume_handle")
+        if previous_handle:
+            upload_store.release(previous_handle)
+        st.session_state["resume_handle"] = handle
+        st.session_state["uploaded_file_id"] = uploaded_document.file_id
+        upload_store.gc()
+    else:
+        upload_store.touch(st.session_state["resume_handle"])
+    filepath = upload_store.path(st.session_state["resume_handle"])
     st.session_state["uploaded_resume_path"] = filepath
     st.markdown(f"**Resume uploaded successfully: {uploaded_document.name}**")
 else:
@@ -115,6 +126,8 @@ else:
     # 1. 如果 session_state 有上次上传的文件，继续用它
     if "uploaded_resume_path" in st.session_state and os.path.exists(st.session_state["uploaded_resume_path"]):
         filepath = st.session_state["uploaded_resume_path"]
+        if st.session_state.get("resume_handle"):
+            upload_store.touch(st.session_state["resume_handle"])
         st.sidebar.write("Using previously uploaded resume.")
     # 2. 否则使用 dummy 文件
     else:
@@ -128,10 +141,6 @@ else:
             unsafe_allow_html=True
         )
 
-# 将最终 resume 写入 temp/resume.pdf，保证分析器始终用最新文件
-if filepath != os.path.join(temp_dir, "resume.pdf"):
-    shutil.copy(filepath, os.path.join(temp_dir, "resume.pdf"))
-
 # ----------------- Service Provider Selection -----------------
 service_provider = "deepseek"  # 默认使用 Deepseek
 user_choice = st.sidebar.selectbox(
@@ -243,9 +252,25 @@ st.sidebar.markdown("""
 </div>
 """, unsafe_allow_html=True)
 
+stream_stats = get_stream_metrics().summary()
+if stream_stats["requests"]:
+    st.sidebar.caption(
+        f"Time to first token: p50 {stream_stats['ttft_p50_ms'] / 1000:.1f}s, "
+        f"p95 {stream_stats['ttft_p95_ms'] / 1000:.1f}s ({stream_stats['requests']} requests)"
+    )
+
 # ----------------- Initialize flow and message history -----------------
-flow_graph = define_graph()
-message_history = StreamlitChatMessageHistory()
+flow_graph = get_compiled_graph()
+# 对话历史按服务端生成的 ID 保存：登录用户按身份（配置 CHAT_HISTORY_DB 时刷新后可恢复），否则每个会话随机生成
+if "chat_session_id" not in st.session_state:
+    st.session_state["chat_session_id"] = chat_session_id(st.user)
+    # 旧版本写入 URL 的会话参数不再使用
+    if "session" in st.query_params:
+        del st.query_params["session"]
+message_history = create_message_history(st.session_state["chat_session_id"], StreamlitChatMessageHistory)
+# 图检查点按服务端生成的线程 ID 保存，不使用 URL 中的会话 ID；刷新页面后新线程从对话历史重新开始
+if "graph_thread_id" not in st.session_state:
+    st.session_state["graph_thread_id"] = uuid.uuid4().hex
 
 for key, default in [("active_option_index", None), ("interaction_history", []),
                      ("response_history", ["Hello! How can I assist you today?"]),
@@ -258,45 +283,55 @@ input_section = st.container()
 
 # ----------------- Functions -----------------
 def initialize_callback_handler(main_container: DeltaGenerator):
-    V = TypeVar("V")
-    def wrap_function(func: Callable[..., V]) -> Callable[..., V]:
-        context = get_script_run_ctx()
-        def wrapped(*args, **kwargs) -> V:
-            add_script_run_ctx(ctx=context)
-            return func(*args, **kwargs)
-        return wrapped
-
-    streamlit_callback_instance = CustomStreamlitCallbackHandler(parent_container=main_container)
-    for method_name, method in inspect.getmembers(streamlit_callback_instance, predicate=inspect.ismethod):
-        setattr(streamlit_callback_instance, method_name, wrap_function(method))
-    return streamlit_callback_instance
+    # 脚本上下文由 handler 自己在需要操作 Streamlit 的回调里按线程挂载，不再逐个包装方法
+    return CustomStreamlitCallbackHandler(parent_container=main_container)
 
 
 def execute_chat_conversation(user_input, graph):
     callback_handler_instance = initialize_callback_handler(st.container())
     callback_handler = callback_handler_instance
 
-    messages_list = list(message_history.messages) + [HumanMessage(content=user_input)]
-
     update_settings()
 
+    # 回调和模型配置随本次运行传入，不写入检查点
+    run_config = thread_config(st.session_state["graph_thread_id"], callback_handler, settings)
+
+    # LLM 输出逐 token 渲染到同一个占位符，回答完成后由对话历史展示完整内容
+    renderer = TokenStreamRenderer(st.empty())
+    output = None
     try:
-        output = graph.invoke(
-            {
-                "messages": messages_list,
-                "user_input": user_input,
-                "config": settings,
-                "callback": callback_handler,
-            },
-            {"recursion_limit": 30},
+        # 上一次运行中途失败且用户重试同一条消息时，从最后完成的节点继续
+        turn_input = run_coroutine(
+            aprepare_turn(graph, run_config, user_input, message_history, filepath)
         )
+        if turn_input is None:
+            callback_handler.write_output("🔁 从上次中断的节点继续执行")
+        # 在共享的后台事件循环上异步执行整张图：所有会话共用一个事件循环，等待 LLM/网络时不占线程
+        stream = graph.astream(
+            turn_input,
+            run_config,
+            stream_mode=["messages", "values"],
+        )
+        for mode, payload in iterate_async(stream):
+            if mode == "messages":
+                renderer.on_message(*payload)
+            else:
+                output = payload
+        callback_handler.flush()
+        timings = renderer.finish()
+        if timings["ttft_ms"] is not None:
+            st.caption(f"⏱️ First token {timings['ttft_ms'] / 1000:.1f}s · total {timings['total_ms'] / 1000:.1f}s")
         message_output = output.get("messages")[-1]
-        message_history.clear()
-        message_history.add_messages(output.get("messages"))
+        # 只追加本轮新增的消息
+        message_history.save(output.get("messages"))
+        # 本轮已完成，只保留最新的检查点
+        run_coroutine(aend_turn(run_config))
 
     except Exception as exc:
+        callback_handler.flush()
+        renderer.finish()
         st.error(f"Error occurred: {exc}")
-        return ":( Sorry, Some error occurred. Can you please try again?"
+        return ":( Sorry, Some error occurred. Send the same message again to continue from where it stopped."
 
     return message_output.content
 
@@ -305,22 +340,17 @@ if st.button("Clear Chat"):
     st.session_state["user_query_history"] = []
     st.session_state["response_history"] = []
     message_history.clear()
+    # 删除图检查点并换用新线程，下一轮不再带上已清除的对话
+    run_coroutine(areset_thread(thread_config(st.session_state["graph_thread_id"], None, {})))
+    st.session_state["graph_thread_id"] = uuid.uuid4().hex
     st.rerun()
 
 # ----------------- Chat Interface -----------------
 streamlit_analytics.start_tracking()
 
 with input_section:
-    options = [
-        "Identify top trends in the tech industry relevant to gen ai",
-        "Find emerging technologies and their potential impact on job opportunities",
-        "Summarize my resume",
-        "Create a career path visualization based on my skills and interests from my resume",
-        "GenAI Jobs at Microsoft",
-        "Job Search GenAI jobs in India.",
-        "Analyze my resume and suggest a suitable job role and search for relevant job listings",
-        "Generate a cover letter for my resume.",
-    ]
+    # 预设问题同时也是本地路由分类器的训练样本
+    options = [query for query, _ in PRESET_ROUTES]
     icons = ["🔍", "🌐", "📝", "📈", "💼", "🌟", "✉️", "🧠"]
 
     selected_query = pills(
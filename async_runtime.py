@@ -0,0 +1,166 @@
+# 后台事件循环服务：一个常驻事件循环 + 一个长连接 aiohttp 会话，供同步工具提交协程
+import asyncio
+import atexit
+import os
+import queue
+import threading
+from typing import Any, AsyncIterator, Coroutine, Iterator, Optional
+
+import aiohttp
+
+
+class AsyncRuntime:
+    """
+    Runs one asyncio event loop in a daemon thread for the whole process.
+
+    Synchronous code (LangChain tools, Streamlit callbacks) submits coroutines with
+    `run`, and every coroutine shares one long-lived aiohttp session, so repeated
+    searches reuse DNS results and warm keep-alive TLS connections.
+
+    Attributes:
+        limit (int): Maximum number of open connections of the shared session.
+        limit_per_host (int): Maximum number of open connections per host.
+        dns_ttl (int): Seconds a DNS lookup stays cached.
+    """
+
+    def __init__(
+        self,
+        limit: Optional[int] = None,
+        limit_per_host: Optional[int] = None,
+        dns_ttl: Optional[int] = None,
+    ) -> None:
+        self.limit = limit or int(os.getenv("HTTP_POOL_LIMIT", "100"))
+        self.limit_per_host = limit_per_host or int(os.getenv("HTTP_POOL_LIMIT_PER_HOST", "10"))
+        self.dns_ttl = dns_ttl or int(os.getenv("HTTP_DNS_TTL", "300"))
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._thread: Optional[threading.Thread] = None
+        self._session: Optional[aiohttp.ClientSession] = None
+        self._lock = threading.Lock()
+
+    @property
+    def loop(self) -> asyncio.AbstractEventLoop:
+        if self._loop is None:
+            with self._lock:
+                if self._loop is None:
+                    loop = asyncio.new_event_loop()
+                    self._thread = threading.Thread(
+                        target=loop.run_forever, name="async-runtime", daemon=True
+                    )
+                    self._thread.start()
+                    self._loop = loop
+        return self._loop
+
+    def run(self, coro: Coroutine, timeout: Optional[float] = None) -> Any:
+        """
+        Run a coroutine on the background loop and block until it returns.
+        """
+        future = asyncio.run_coroutine_threadsafe(coro, self.loop)
+        return future.result(timeout)
+
+    def iterate(self, iterator: AsyncIterator) -> Iterator:
+        """
+        Consume an async iterator on the background loop and yield its items here.
+
+        Items are handed over through a queue as they arrive, so the caller (e.g. the
+        Streamlit script thread) can render them immediately. Stopping early cancels
+        the async iterator.
+        """
+        items: queue.Queue = queue.Queue()
+        end = object()
+
+        async def pump():
+            try:
+                async for item in iterator:
+                    items.put((item, None))
+            except Exception as exc:
+                items.put((end, exc))
+                return
+            items.put((end, None))
+
+        future = asyncio.run_coroutine_threadsafe(pump(), self.loop)
+        try:
+            while True:
+                item, error = items.get()
+                if item is end:
+                    if error is not None:
+                        raise error
+                    return
+                yield item
+        finally:
+            future.cancel()
+
+    async def get_session(self) -> aiohttp.ClientSession:
+        """
+        Return the shared aiohttp session. Must be awaited on the background loop.
+        """
+        if asyncio.get_running_loop() is not self._loop:
+            raise RuntimeError("The shared session can only be used on the runtime loop")
+        if self._session is None or self._session.closed:
+            connector = aiohttp.TCPConnector(
+                limit=self.limit,
+                limit_per_host=self.limit_per_host,
+                ttl_dns_cache=self.dns_ttl,
+                keepalive_timeout=30,
+            )
+            self._session = aiohttp.ClientSession(
+                connector=connector, headers={"User-Agent": "Mozilla/5.0"}
+            )
+        return self._session
+
+    def close(self) -> None:
+        """
+        Close the shared session and stop the background loop.
+        """
+        if self._loop is None:
+            return
+        if self._session is not None and not self._session.closed:
+            self.run(self._session.close(), timeout=5)
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._thread.join(timeout=5)
+        self._loop = None
+        self._session = None
+
+
+_runtime = AsyncRuntime()
+atexit.register(_runtime.close)
+
+
+def get_async_runtime() -> AsyncRuntime:
+    """
+    Return the process-wide AsyncRuntime.
+    """
+    return _runtime
+
+
+def run_coroutine(coro: Coroutine, timeout: Optional[float] = None) -> Any:
+    """
+    Run a coroutine on the shared background loop from synchronous code.
+    """
+    return _runtime.run(coro, timeout)
+
+
+def iterate_async(iterator: AsyncIterator) -> Iterator:
+    """
+    Iterate an async iterator on the shared background loop from synchronous code.
+    """
+    return _runtime.iterate(iterator)
+
+
+async def run_on_runtime(coro: Coroutine) -> Any:
+    """
+    Await a coroutine on the shared background loop from any event loop.
+
+    Code already running on the runtime loop awaits it directly; other loops wait on
+    it without blocking, so loop-bound resources such as the shared session stay valid.
+    """
+    loop = _runtime.loop
+    if asyncio.get_running_loop() is loop:
+        return await coro
+    return await asyncio.wrap_future(asyncio.run_coroutine_threadsafe(coro, loop))
+
+
+async def get_shared_session() -> aiohttp.ClientSession:
+    """
+    Return the shared aiohttp session of the background loop.
+    """
+    return await _runtime.get_session()
@@ -0,0 +1,128 @@
+# 回调上下文传递基准：对比逐个包装 handler 方法（旧做法）与 ScriptRunContextMixin 的单次事件开销和每轮创建开销
+"""
+Per-event overhead of propagating the Streamlit script-run context to callbacks.
+
+Usage:
+    python benchmarks/bench_callback_context.py [--events 200000]
+
+"wrapped" is the previous app.initialize_callback_handler: every bound method is
+wrapped with add_script_run_ctx via inspect.getmembers on each turn. "mixin" is
+ScriptRunContextMixin. Both sit on a handler whose callbacks do nothing, so the
+numbers are the propagation overhead only. Events are fired from a worker thread,
+as LangChain does for sync handlers.
+"""
+import argparse
+import inspect
+import os
+import sys
+import threading
+import time
+from types import SimpleNamespace
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from streamlit.runtime.scriptrunner import add_script_run_ctx, get_script_run_ctx  # noqa: E402
+
+from script_context import ScriptRunContextMixin  # noqa: E402
+
+
+class QuietHandler:
+    """Callback handler whose callbacks do nothing."""
+
+    def __init__(self, parent_container=None):
+        self._parent_container = parent_container
+
+    def on_llm_start(self, *args, **kwargs):
+        pass
+
+    def on_llm_new_token(self, token, **kwargs):
+        pass
+
+    def on_llm_end(self, *args, **kwargs):
+        pass
+
+    def on_tool_start(self, *args, **kwargs):
+        pass
+
+    def on_tool_end(self, *args, **kwargs):
+        pass
+
+    def on_chain_start(self, *args, **kwargs):
+        pass
+
+    def on_chain_end(self, *args, **kwargs):
+        pass
+
+
+class MixinHandler(ScriptRunContextMixin, QuietHandler):
+    pass
+
+
+def wrapped_handler():
+    # 旧版 app.initialize_callback_handler 的做法
+    def wrap_function(func):
+        context = get_script_run_ctx()
+
+        def wrapped(*args, **kwargs):
+            add_script_run_ctx(ctx=context)
+            return func(*args, **kwargs)
+
+        return wrapped
+
+    handler = QuietHandler()
+    for method_name, method in inspect.getmembers(handler, predicate=inspect.ismethod):
+        setattr(handler, method_name, wrap_function(method))
+    return handler
+
+
+def time_events(handler, events):
+    """Fire token and chain events from a worker thread; return ns per event."""
+    result = {}
+
+    def run():
+        started = time.perf_counter()
+        for _ in range(events):
+            handler.on_llm_new_token("x")
+        result["token"] = (time.perf_counter() - started) * 1e9 / events
+        started = time.perf_counter()
+        for _ in range(events):
+            handler.on_chain_start({}, {})
+        result["chain"] = (time.perf_counter() - started) * 1e9 / events
+
+    worker = threading.Thread(target=run)
+    worker.start()
+    worker.join()
+    return result
+
+
+def time_setup(factory, turns=2000):
+    started = time.perf_counter()
+    for _ in range(turns):
+        factory()
+    return (time.perf_counter() - started) * 1e6 / turns
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--events", type=int, default=200000)
+    args = parser.parse_args()
+
+    # 基准在 streamlit run 之外运行，给主线程挂一个最小的脚本上下文
+    add_script_run_ctx(
+        threading.current_thread(),
+        SimpleNamespace(pages_manager=SimpleNamespace(main_script_hash="bench")),
+    )
+
+    factories = {"baseline": QuietHandler, "wrapped": wrapped_handler, "mixin": MixinHandler}
+    baseline = None
+    for label, factory in factories.items():
+        timings = time_events(factory(), args.events)
+        if baseline is None:
+            baseline = timings
+        print(
+            f"{label:9s}: token {timings['token']:7.1f} ns/event "
+            f"(+{timings['token'] - baseline['token']:6.1f}), "
+            f"chain {timings['chain']:7.1f} ns/event "
+            f"(+{timings['chain'] - baseline['chain']:6.1f}), "
+            f"setup {time_setup(factory):7.2f} us/turn"
+        )
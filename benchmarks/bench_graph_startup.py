@@ -0,0 +1,74 @@
+# 启动基准：对比编译图注册表的冷启动 / 热启动延迟
+"""
+Compare cold and warm latency of graph compilation and of a full page render.
+
+Usage:
+    python benchmarks/bench_graph_startup.py [--renders 5]
+
+"cold" is the first call in a fresh process (the graph is compiled), "warm" are the
+following calls that hit the process-wide registry, which is what every Streamlit
+rerun after the first one pays.
+"""
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import agents  # noqa: E402
+from agents import define_graph, get_compiled_graph  # noqa: E402
+
+
+def time_call(func, repeat):
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        timings.append((time.perf_counter() - start) * 1000)
+    return timings
+
+
+def bench_graph(repeat):
+    # 清空注册表，保证第一次调用是真正的冷启动
+    agents._graph_registry.clear()
+    cold = time_call(get_compiled_graph, 1)[0]
+    warm = time_call(get_compiled_graph, repeat)
+    rebuild = time_call(define_graph, repeat)
+    print(f"get_compiled_graph cold : {cold:8.2f} ms")
+    print(f"get_compiled_graph warm : {sum(warm) / len(warm):8.4f} ms (avg of {repeat})")
+    print(f"define_graph every call : {sum(rebuild) / len(rebuild):8.2f} ms (avg of {repeat})")
+
+
+def bench_page_render(renders):
+    try:
+        from streamlit.testing.v1 import AppTest
+    except ImportError:
+        print("streamlit.testing is not available, skipping page render benchmark")
+        return
+
+    app_path = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "app.py")
+    app = AppTest.from_file(app_path, default_timeout=60)
+    app.secrets["DEEPSEEK_API_KEY"] = "benchmark"
+
+    timings = []
+    for _ in range(renders):
+        start = time.perf_counter()
+        app.run()
+        timings.append((time.perf_counter() - start) * 1000)
+
+    print(f"page render cold       : {timings[0]:8.2f} ms")
+    if len(timings) > 1:
+        warm = timings[1:]
+        print(f"page render warm       : {sum(warm) / len(warm):8.2f} ms (avg of {len(warm)})")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--repeat", type=int, default=20)
+    parser.add_argument("--renders", type=int, default=5)
+    args = parser.parse_args()
+
+    # 先测页面渲染：第一次渲染时注册表为空
+    bench_page_render(args.renders)
+    bench_graph(args.repeat)
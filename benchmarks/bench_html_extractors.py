@@ -0,0 +1,86 @@
+# HTML 提取后端微基准：对比每个页面的解析耗时和提取出的字段
+"""
+Per-page parse time of each installed extractor backend over the saved fixture pages.
+
+Usage:
+    python benchmarks/bench_html_extractors.py [--repeat 200]
+
+"full-soup" is the previous approach (full BeautifulSoup html.parser tree per page)
+and is kept as the baseline.
+"""
+import argparse
+import os
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from extractors import EXTRACTORS, JOB_FIELD_SELECTORS, to_css  # noqa: E402
+
+FIXTURES = os.path.join(ROOT, "benchmarks", "fixtures")
+
+
+class FullSoupBaseline:
+    name = "full-soup"
+
+    def __init__(self) -> None:
+        from bs4 import BeautifulSoup
+
+        self._soup = BeautifulSoup
+
+    def extract_job(self, html):
+        soup = self._soup(html, "html.parser")
+        job_post = {}
+        for field, selector in JOB_FIELD_SELECTORS.items():
+            node = soup.select_one(to_css(selector))
+            job_post[field] = node.get_text().strip() if node is not None else ""
+        link = soup.find("a", class_="topcard__link")
+        job_post["apply_link"] = link.get("href") if link is not None else ""
+        return job_post
+
+    def extract_job_ids(self, html):
+        soup = self._soup(html, "html.parser")
+        return [
+            li.find("div", {"class": "base-card"}).get("data-entity-urn").split(":")[3]
+            for li in soup.find_all("li")
+        ]
+
+
+def load_backends():
+    backends = []
+    for factory in [FullSoupBaseline, *EXTRACTORS.values()]:
+        try:
+            backends.append(factory())
+        except ImportError as exc:
+            print(f"skipping {factory.__name__}: {exc}")
+    return backends
+
+
+def per_page_ms(func, html, repeat):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        func(html)
+    return (time.perf_counter() - start) * 1000 / repeat
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--repeat", type=int, default=200)
+    args = parser.parse_args()
+
+    with open(os.path.join(FIXTURES, "job_posting.html"), encoding="utf-8") as f:
+        job_html = f.read()
+    with open(os.path.join(FIXTURES, "search_page.html"), encoding="utf-8") as f:
+        search_html = f.read()
+
+    print(f"{'backend':<12} {'job page (ms)':>14} {'search page (ms)':>17}  fields / ids")
+    for backend in load_backends():
+        job_ms = per_page_ms(backend.extract_job, job_html, args.repeat)
+        search_ms = per_page_ms(backend.extract_job_ids, search_html, args.repeat)
+        job = backend.extract_job(job_html)
+        filled = sum(1 for value in job.values() if value)
+        ids = backend.extract_job_ids(search_html)
+        print(f"{backend.name:<12} {job_ms:>14.3f} {search_ms:>17.3f}  {filled}/{len(job)} fields, {len(ids)} ids")
+        for field, value in job.items():
+            print(f"    {field:<15} {value[:60]!r}")
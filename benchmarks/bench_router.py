@@ -0,0 +1,104 @@
+# 混合路由基准：统计本地命中率、本地分类耗时，以及与每次都调用 LLM Supervisor 的对比
+"""
+Hit rate and added latency of the hybrid router on a small labelled sample.
+
+Usage:
+    python benchmarks/bench_router.py [--llm-ms 800]
+
+The LLM supervisor is simulated: it sleeps --llm-ms and returns the expected route,
+so the numbers show the routing overhead only. The sample is routed twice; on the
+second pass the LLM decisions from the first pass are already in the training data
+(the router refits in the background; here the refit is run explicitly between passes).
+
+Before timing, the app's preset queries are checked as a regression: every one must
+be routed locally to its expected worker or left to the LLM, never misrouted.
+The script exits with status 1 if one is.
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from intent import classify  # noqa: E402
+from router import PRESET_ROUTES, HybridRouter  # noqa: E402
+
+HELD_OUT = [
+    ("Find data scientist jobs in Paris", "JobSearcher"),
+    ("Any openings for a backend developer at Amazon?", "JobSearcher"),
+    ("Summarise my CV", "ResumeAnalyzer"),
+    ("Which skills are missing from my resume for a PM role?", "ResumeAnalyzer"),
+    ("Write me a cover letter for the Microsoft position", "CoverLetterGenerator"),
+    ("latest trends in AI hiring", "WebResearcher"),
+    ("Research Anthropic as a company", "WebResearcher"),
+    ("How big is the generative AI market this year?", "WebResearcher"),
+    ("Make the answer above shorter", "ChatBot"),
+    ("Thank you!", "ChatBot"),
+    ("帮我找深圳的前端开发职位", "JobSearcher"),
+    ("概括我的简历", "ResumeAnalyzer"),
+]
+
+
+def check_presets(router):
+    """
+    Return the preset queries the local tiers route to the wrong worker.
+    """
+    wrong = []
+    for text, expected in PRESET_ROUTES:
+        decision = router.classify(text, classify(text))
+        if decision is not None and decision.route != expected:
+            wrong.append((text, expected, decision))
+    return wrong
+
+
+def run_pass(router, sample, llm_ms):
+    correct = 0
+    total_ms = 0.0
+    for text, expected in sample:
+        def fallback(expected=expected):
+            time.sleep(llm_ms / 1000)
+            return expected
+
+        decision = router.route(text, fallback, classify(text))
+        correct += decision.route == expected
+        total_ms += decision.latency_ms
+    return correct, total_ms
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--llm-ms", type=float, default=800.0)
+    args = parser.parse_args()
+
+    sample = PRESET_ROUTES + HELD_OUT
+    with tempfile.TemporaryDirectory() as tmp:
+        router = HybridRouter(log_path=os.path.join(tmp, "router_log.jsonl"))
+        wrong = check_presets(router)
+        for text, expected, decision in wrong:
+            print(f"MISROUTED preset: {text!r} -> {decision.route} ({decision.source}), expected {expected}")
+        if wrong:
+            sys.exit(1)
+        print(f"presets: {len(PRESET_ROUTES)}/{len(PRESET_ROUTES)} routed correctly or left to the LLM")
+        for label in ("first pass", "second pass"):
+            if label == "second pass":
+                started = time.perf_counter()
+                router.refit()
+                print(f"refit: {(time.perf_counter() - started) * 1000:.1f} ms (background thread in the app)")
+            before = router.stats()
+            correct, total_ms = run_pass(router, sample, args.llm_ms)
+            after = router.stats()
+            local = sum(after[source] - before[source] for source in ("keywords", "classifier"))
+            print(
+                f"{label:12s}: {local}/{len(sample)} answered locally "
+                f"({local / len(sample):.0%}), {correct}/{len(sample)} correct, "
+                f"routing {total_ms / len(sample):7.1f} ms/request "
+                f"vs {args.llm_ms:.0f} ms always-LLM"
+            )
+        stats = router.stats()
+        print(
+            f"local classification: {stats['local_ms_avg']:.3f} ms avg, "
+            f"{stats['local_ms_max']:.3f} ms max (includes the first fit)"
+        )
+        print(stats)
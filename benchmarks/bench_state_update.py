@@ -0,0 +1,83 @@
+# 节点状态更新基准：对比 state.copy() + 差异比较（旧做法）与写时复制视图 + 部分更新在不同历史长度下的单步耗时和内存
+"""
+Per-step cost of producing a node's state update as the history grows.
+
+Usage:
+    python benchmarks/bench_state_update.py [--steps 2000]
+
+"copy+diff" is the previous as_state_update: the node works on a copy of the state
+and its message list, and the wrapper diffs the result against the input. "view" is
+agents.state_view/state_update. The node itself only appends one message and sets
+next_step, so the numbers are the state plumbing only.
+"""
+import argparse
+import os
+import sys
+import time
+import tracemalloc
+from collections import ChainMap
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from langchain_core.messages import AIMessage, HumanMessage  # noqa: E402
+
+
+def copy_diff_step(state):
+    branch_state = {**state, "messages": list(state.get("messages", []))}
+    seen = len(branch_state["messages"])
+    new_state = branch_state.copy()
+    new_state["messages"].append(AIMessage(content="ok", name="ChatBot"))
+    new_state["next_step"] = "Supervisor"
+    update = {
+        key: value
+        for key, value in new_state.items()
+        if key != "messages" and (key not in state or state[key] is not value and state[key] != value)
+    }
+    update["messages"] = new_state.get("messages", [])[seen:]
+    return update
+
+
+def view_step(state):
+    # 与 agents.state_view / state_update 相同，避免导入 langgraph
+    new_state = ChainMap({}, state)
+    new_state["next_step"] = "Supervisor"
+    return {**new_state.maps[0], "messages": [AIMessage(content="ok", name="ChatBot")]}
+
+
+def make_state(history):
+    messages = [
+        HumanMessage(content=f"message {i}") if i % 2 == 0 else AIMessage(content=f"reply {i}", name="ChatBot")
+        for i in range(history)
+    ]
+    return {
+        "messages": messages,
+        "user_input": "hello",
+        "next_step": "ChatBot",
+        "resume_text": "x" * 20000,
+        "job_info": "y" * 5000,
+        "history_summary": {"ChatBot": {"covered": 0, "text": ""}},
+    }
+
+
+def measure(step, state, steps):
+    started = time.perf_counter()
+    for _ in range(steps):
+        step(state)
+    elapsed_us = (time.perf_counter() - started) * 1e6 / steps
+    tracemalloc.start()
+    step(state)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return elapsed_us, peak
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--steps", type=int, default=2000)
+    args = parser.parse_args()
+
+    for history in (10, 100, 1000, 10000):
+        state = make_state(history)
+        for label, step in (("copy+diff", copy_diff_step), ("view", view_step)):
+            elapsed_us, peak = measure(step, state, args.steps)
+            print(f"history {history:6d} {label:9s}: {elapsed_us:8.2f} us/step, peak {peak / 1024:8.1f} KiB")
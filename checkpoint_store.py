@@ -0,0 +1,152 @@
+# 图执行检查点：基于 SQLite 的 LangGraph checkpointer，按会话 thread_id 保存每一步后的状态，失败后可从最后完成的节点继续
+import os
+import threading
+import time
+from typing import Optional
+
+import aiosqlite
+from langgraph.checkpoint.sqlite.aio import AsyncSqliteSaver
+
+from async_runtime import run_coroutine
+
+
+class CheckpointStore:
+    """
+    SQLite checkpointer of the graph plus the housekeeping that keeps the file bounded.
+
+    After a completed turn a thread only needs its newest checkpoint, so `acompact`
+    drops the older ones. Threads idle for longer than `ttl` seconds are deleted by
+    `aexpire`, which `atouch` runs at most every `prune_interval` seconds.
+
+    Attributes:
+        saver (AsyncSqliteSaver): Checkpointer passed to workflow.compile.
+        ttl (float): Seconds a thread is kept after its last turn (GRAPH_CHECKPOINT_TTL, default 7 days).
+        prune_interval (float): Minimum seconds between two expiry runs (GRAPH_CHECKPOINT_PRUNE_INTERVAL).
+    """
+
+    def __init__(
+        self,
+        saver: AsyncSqliteSaver,
+        ttl: Optional[float] = None,
+        prune_interval: Optional[float] = None,
+    ) -> None:
+        self.saver = saver
+        self.ttl = ttl if ttl is not None else float(os.getenv("GRAPH_CHECKPOINT_TTL", str(7 * 24 * 3600)))
+        self.prune_interval = prune_interval if prune_interval is not None else float(
+            os.getenv("GRAPH_CHECKPOINT_PRUNE_INTERVAL", "3600")
+        )
+        self._last_prune = 0.0
+
+    @classmethod
+    async def aopen(cls, path: str) -> "CheckpointStore":
+        conn = await aiosqlite.connect(path)
+        await conn.execute("PRAGMA journal_mode=WAL")
+        saver = AsyncSqliteSaver(conn)
+        await saver.setup()
+        await conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS checkpoint_threads (
+                thread_id TEXT PRIMARY KEY,
+                updated_at REAL NOT NULL
+            )
+            """
+        )
+        await conn.commit()
+        return cls(saver)
+
+    async def _execute(self, *statements) -> None:
+        # 与 saver 共用连接和锁，避免和正在写入的检查点交错
+        async with self.saver.lock:
+            for sql, params in statements:
+                await self.saver.conn.execute(sql, params)
+            await self.saver.conn.commit()
+
+    async def atouch(self, thread_id: str) -> None:
+        """
+        Mark the thread as used now and expire idle threads if the interval has passed.
+        """
+        await self._execute(
+            (
+                "INSERT OR REPLACE INTO checkpoint_threads (thread_id, updated_at) VALUES (?, ?)",
+                (thread_id, time.time()),
+            )
+        )
+        if time.monotonic() - self._last_prune >= self.prune_interval:
+            self._last_prune = time.monotonic()
+            await self.aexpire()
+
+    async def acompact(self, thread_id: str) -> None:
+        """
+        Delete every checkpoint of the thread except the newest one, with their writes.
+
+        Only call this after a turn completed; a failed turn needs its pending writes to resume.
+        """
+        latest = (
+            "SELECT MAX(checkpoint_id) FROM checkpoints WHERE thread_id = ? AND checkpoint_ns = ''"
+        )
+        await self._execute(
+            (
+                f"DELETE FROM writes WHERE thread_id = ? AND checkpoint_id < ({latest})",
+                (thread_id, thread_id),
+            ),
+            (
+                f"DELETE FROM checkpoints WHERE thread_id = ? AND checkpoint_id < ({latest})",
+                (thread_id, thread_id),
+            ),
+        )
+
+    async def adelete(self, thread_id: str) -> None:
+        """
+        Delete all checkpoints of the thread.
+        """
+        await self.saver.adelete_thread(thread_id)
+        await self._execute(("DELETE FROM checkpoint_threads WHERE thread_id = ?", (thread_id,)))
+
+    async def aexpire(self) -> None:
+        """
+        Delete the threads whose last turn is older than `ttl`.
+        """
+        expired = "SELECT thread_id FROM checkpoint_threads WHERE updated_at < ?"
+        cutoff = time.time() - self.ttl
+        await self._execute(
+            (f"DELETE FROM writes WHERE thread_id IN ({expired})", (cutoff,)),
+            (f"DELETE FROM checkpoints WHERE thread_id IN ({expired})", (cutoff,)),
+            ("DELETE FROM checkpoint_threads WHERE updated_at < ?", (cutoff,)),
+        )
+
+
+_store: Optional[CheckpointStore] = None
+_store_lock = threading.Lock()
+
+
+def get_checkpoint_store(path: Optional[str] = None) -> CheckpointStore:
+    """
+    Return the process-wide CheckpointStore, opening it on first use.
+
+    The saver is bound to the event loop it was created on, so it is created on the
+    shared background loop that runs every graph (see async_runtime). Must not be
+    called from that loop.
+
+    Args:
+        path (str): SQLite database file. Defaults to GRAPH_CHECKPOINT_DB or
+            temp/graph_checkpoints.sqlite3.
+    """
+    global _store
+    if _store is None:
+        with _store_lock:
+            if _store is None:
+                path = path or os.getenv(
+                    "GRAPH_CHECKPOINT_DB", os.path.join("temp", "graph_checkpoints.sqlite3")
+                )
+                directory = os.path.dirname(path)
+                if directory:
+                    os.makedirs(directory, exist_ok=True)
+                _store = run_coroutine(CheckpointStore.aopen(path))
+    return _store
+
+
+def get_checkpointer() -> AsyncSqliteSaver:
+    """
+    Return the process-wide SQLite checkpointer of the graph.
+    """
+    return get_checkpoint_store().saver
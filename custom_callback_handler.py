@@ -1,4 +1,8 @@
-from typing import Any
+import os
+import threading
+import time
+from contextvars import ContextVar
+from typing import Any, Optional
 from langchain_community.callbacks import StreamlitCallbackHandler
 from streamlit.external.langchain.streamlit_callback_handler import (
     StreamlitCallbackHandler,
@@ -6,24 +10,114 @@ from streamlit.external.langchain.streamlit_callback_handler import (
 )
 from langchain.schema import AgentAction
 
+from script_context import ScriptRunContextMixin
+
+LOG_LEVELS = {"debug": 10, "info": 20, "warning": 30, "error": 40}
+
+# 当前节点的日志分组；每个节点在自己的上下文中运行，并行分支各自写入自己的分组
+_current_section: ContextVar = ContextVar("ui_log_section", default=None)
+
+
+class _LogSection:
+    """
+    One updating Streamlit element holding the buffered log lines of a node.
+    """
+
+    def __init__(self, handler: "CustomStreamlitCallbackHandler") -> None:
+        self.handler = handler
+        handler.attach_script_ctx()
+        self.placeholder = handler._parent_container.empty()
+        self.lines = []
+        self.flushed = 0
+
+
 # LangChain 提供的 Streamlit 回调类，用于在 Streamlit 中实时展示 Agent 执行日志。
-class CustomStreamlitCallbackHandler(StreamlitCallbackHandler):
-    def __init__(self, *args, **kwargs):
+class CustomStreamlitCallbackHandler(ScriptRunContextMixin, StreamlitCallbackHandler):
+    """
+    Streamlit callback handler with a buffered, rate-limited log sink.
+
+    Safe to call from worker threads and the background event loop: the script-run
+    context is attached by ScriptRunContextMixin before anything touches Streamlit.
+
+    `write_output` lines are collected per node and rendered into one updating element,
+    flushed when `flush_interval` seconds have passed since the last flush, when
+    `flush_size` lines are pending, or before an LLM/tool call starts. Messages below
+    `log_level` (UI_LOG_LEVEL, default "info") are dropped, and `write_debug` formats its
+    arguments only when debug output is enabled.
+    """
+
+    def __init__(
+        self,
+        *args,
+        log_level: Optional[str] = None,
+        flush_interval: Optional[float] = None,
+        flush_size: Optional[int] = None,
+        **kwargs,
+    ):
         super().__init__(*args, **kwargs)
         self.agent_sequence = []  # 记录agent执行顺序
+        self.log_level = LOG_LEVELS.get((log_level or os.getenv("UI_LOG_LEVEL", "info")).lower(), 20)
+        self.flush_interval = flush_interval if flush_interval is not None else float(
+            os.getenv("UI_LOG_FLUSH_INTERVAL", "0.5")
+        )
+        self.flush_size = flush_size or int(os.getenv("UI_LOG_FLUSH_SIZE", "20"))
+        self._sections = []
+        self._last_flush = 0.0
+        self._log_lock = threading.Lock()
 
     def write_agent_name(self, name: str):
+        self.flush()
+        self.attach_script_ctx()
         self._parent_container.write(name)
+        # 每个 agent 的日志写入它自己的一个可更新元素
+        with self._log_lock:
+            section = _LogSection(self)
+            self._sections.append(section)
+        _current_section.set(section)
         # 记录agent执行顺序
         self.agent_sequence.append(name)
 
-    def write_output(self, text: str):
-        """在 Streamlit 界面输出日志或调试信息"""
-        # 你可以根据风格选择 markdown 或普通 write
-        self._parent_container.markdown(
-            f"<div style='color:gray; font-size:0.9em;'>{text}</div>",
-            unsafe_allow_html=True,
-        )
+    def is_enabled(self, level: str) -> bool:
+        return LOG_LEVELS.get(level, 20) >= self.log_level
+
+    def write_output(self, text: str, level: str = "info"):
+        """在 Streamlit 界面输出日志或调试信息（先缓冲，按时间或条数合并刷新）"""
+        if not self.is_enabled(level):
+            return
+        section = _current_section.get()
+        with self._log_lock:
+            if section is None or section.handler is not self:
+                section = _LogSection(self)
+                self._sections.append(section)
+                _current_section.set(section)
+            section.lines.append(str(text).replace("\n", "<br>"))
+            due = (
+                time.monotonic() - self._last_flush >= self.flush_interval
+                or len(section.lines) - section.flushed >= self.flush_size
+            )
+        if due:
+            self.flush()
+
+    def write_debug(self, message: str, *args: Any):
+        """Debug 日志：只有启用 debug 级别时才格式化参数"""
+        if self.is_enabled("debug"):
+            self.write_output(message % args if args else message, level="debug")
+
+    def flush(self):
+        """把所有分组中未显示的日志一次性渲染出来"""
+        with self._log_lock:
+            pending = [section for section in self._sections if section.flushed < len(section.lines)]
+            for section in pending:
+                section.flushed = len(section.lines)
+            self._last_flush = time.monotonic()
+            rendered = [(section.placeholder, "<br>".join(section.lines)) for section in pending]
+        if rendered:
+            self.attach_script_ctx()
+        for placeholder, body in rendered:
+            placeholder.markdown(
+                f"<div style='color:gray; font-size:0.9em;'>{body}</div>",
+                unsafe_allow_html=True,
+            )
 
     def get_agent_sequence(self):
         return self.agent_sequence
@@ -31,11 +125,19 @@ class CustomStreamlitCallbackHandler(StreamlitCallbackHandler):
     def clear_agent_sequence(self):
         self.agent_sequence = []
 
+    def on_llm_start(self, *args: Any, **kwargs: Any) -> None:
+        # 等待 LLM 之前先把缓冲的日志显示出来
+        self.flush()
+        return super().on_llm_start(*args, **kwargs)
+
+    def on_tool_start(self, *args: Any, **kwargs: Any) -> None:
+        self.flush()
+        return super().on_tool_start(*args, **kwargs)
+
     def on_agent_action(self, action: AgentAction, **kwargs: Any) -> Any:
         # 显示agent正在执行的动作
         tool_name = action.tool
         tool_input = action.tool_input
-        self._parent_container.write(f"🔧 正在执行: {tool_name}")
+        self.write_output(f"🔧 正在执行: {tool_name}")
+        self.flush()
         return super().on_agent_action(action, **kwargs)
-
-
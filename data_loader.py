@@ -1,5 +1,5 @@
 from docx import Document
-from langchain_community.document_loaders import PyMuPDFLoader
+from pdf_extract import iter_pdf_pages
 
 # 从 PDF 简历中提取文本
 def load_resume(file_path):
@@ -12,12 +12,8 @@ def load_resume(file_path):
     Returns:
     str: The content of the CV file.
     """
-    loader = PyMuPDFLoader(file_path)
-    pages = loader.load()
-    page_content = ""
-    for page in pages:
-        page_content += page.page_content
-    return page_content
+    # 长文档按页并行提取
+    return "".join(iter_pdf_pages(file_path))
 
 # 把文本写入 Word 文档，每行文本作为独立段落
 def write_cover_letter_to_doc(text, filename="temp/cover_letter.docx"):
@@ -0,0 +1,209 @@
+# LinkedIn 页面字段提取后端：selectolax / lxml 优先，BeautifulSoup 局部解析兜底
+"""
+Pluggable HTML extractors for LinkedIn guest job pages.
+
+Every backend reads the same selector table, so they return identical fields.
+The backend is chosen with the JOB_HTML_PARSER environment variable
+("selectolax", "lxml" or "soup"); by default the fastest installed one is used.
+"""
+import os
+import re
+import threading
+from typing import Dict, List, Optional
+
+# 字段 -> (标签, 必须包含的 class)，只匹配区分度高的 class，不再依赖完整的 class 字符串
+JOB_FIELD_SELECTORS = {
+    "job_title": ("h2", ("top-card-layout__title", "topcard__title")),
+    "job_location": ("span", ("topcard__flavor", "topcard__flavor--bullet")),
+    "company_name": ("a", ("topcard__org-name-link",)),
+    "time_posted": ("span", ("posted-time-ago__text",)),
+    "num_applicants": ("span", ("num-applicants__caption",)),
+    "job_desc_text": ("div", ("decorated-job-posting__details",)),
+}
+APPLY_LINK_SELECTOR = ("a", ("topcard__link",))
+JOB_CARD_SELECTOR = ("div", ("base-card",))
+JOB_CARD_URN_ATTR = "data-entity-urn"
+
+
+def to_css(selector) -> str:
+    tag, classes = selector
+    return tag + "".join(f".{cls}" for cls in classes)
+
+
+def to_xpath(selector) -> str:
+    tag, classes = selector
+    conditions = " and ".join(
+        f"contains(concat(' ', normalize-space(@class), ' '), ' {cls} ')" for cls in classes
+    )
+    return f"//{tag}[{conditions}]"
+
+
+def job_id_from_urn(urn: Optional[str]) -> Optional[str]:
+    # urn:li:jobPosting:<id>
+    if not urn:
+        return None
+    parts = urn.split(":")
+    return parts[3] if len(parts) > 3 else None
+
+
+class SoupExtractor:
+    """
+    BeautifulSoup backend. Only the elements carrying the classes of interest are
+    built into the tree (SoupStrainer), instead of the whole page.
+    """
+
+    name = "soup"
+
+    def __init__(self) -> None:
+        from bs4 import BeautifulSoup, SoupStrainer
+
+        self._soup = BeautifulSoup
+        self._features = "html.parser"
+        selectors = list(JOB_FIELD_SELECTORS.values()) + [APPLY_LINK_SELECTOR]
+        self._job_strainer = SoupStrainer(
+            class_=self._class_pattern({classes[0] for _, classes in selectors})
+        )
+        self._card_strainer = SoupStrainer(class_=self._class_pattern([JOB_CARD_SELECTOR[1][0]]))
+        self._field_css = {field: to_css(sel) for field, sel in JOB_FIELD_SELECTORS.items()}
+        self._apply_css = to_css(APPLY_LINK_SELECTOR)
+        self._card_css = to_css(JOB_CARD_SELECTOR)
+
+    @staticmethod
+    def _class_pattern(classes):
+        # 解析阶段 class 还是原始字符串，用正则按单个 class 匹配
+        alternatives = "|".join(re.escape(cls) for cls in sorted(classes))
+        return re.compile(rf"(?:^|\s)(?:{alternatives})(?:\s|$)")
+
+    def extract_job(self, html: str) -> Dict[str, str]:
+        soup = self._soup(html, self._features, parse_only=self._job_strainer)
+        job_post = {}
+        for field, css in self._field_css.items():
+            node = soup.select_one(css)
+            job_post[field] = node.get_text().strip() if node is not None else ""
+        link = soup.select_one(self._apply_css)
+        job_post["apply_link"] = (link.get("href") or "") if link is not None else ""
+        return job_post
+
+    def extract_job_ids(self, html: str) -> List[str]:
+        soup = self._soup(html, self._features, parse_only=self._card_strainer)
+        ids = [job_id_from_urn(card.get(JOB_CARD_URN_ATTR)) for card in soup.select(self._card_css)]
+        return [job_id for job_id in ids if job_id]
+
+
+class LxmlExtractor:
+    """
+    lxml backend using precompiled XPath expressions.
+    """
+
+    name = "lxml"
+
+    def __init__(self) -> None:
+        from lxml import etree, html as lxml_html
+
+        self._fromstring = lxml_html.fromstring
+        self._field_xpath = {
+            field: etree.XPath(to_xpath(sel)) for field, sel in JOB_FIELD_SELECTORS.items()
+        }
+        self._apply_xpath = etree.XPath(to_xpath(APPLY_LINK_SELECTOR))
+        self._card_xpath = etree.XPath(to_xpath(JOB_CARD_SELECTOR))
+
+    def extract_job(self, html: str) -> Dict[str, str]:
+        if not html.strip():
+            return {**{field: "" for field in JOB_FIELD_SELECTORS}, "apply_link": ""}
+        root = self._fromstring(html)
+        job_post = {}
+        for field, xpath in self._field_xpath.items():
+            nodes = xpath(root)
+            job_post[field] = nodes[0].text_content().strip() if nodes else ""
+        links = self._apply_xpath(root)
+        job_post["apply_link"] = (links[0].get("href") or "") if links else ""
+        return job_post
+
+    def extract_job_ids(self, html: str) -> List[str]:
+        if not html.strip():
+            return []
+        ids = [job_id_from_urn(card.get(JOB_CARD_URN_ATTR)) for card in self._card_xpath(self._fromstring(html))]
+        return [job_id for job_id in ids if job_id]
+
+
+class SelectolaxExtractor:
+    """
+    selectolax (lexbor) backend using CSS selectors.
+    """
+
+    name = "selectolax"
+
+    def __init__(self) -> None:
+        from selectolax.lexbor import LexborHTMLParser
+
+        self._parser = LexborHTMLParser
+        self._field_css = {field: to_css(sel) for field, sel in JOB_FIELD_SELECTORS.items()}
+        self._apply_css = to_css(APPLY_LINK_SELECTOR)
+        self._card_css = to_css(JOB_CARD_SELECTOR)
+
+    def extract_job(self, html: str) -> Dict[str, str]:
+        tree = self._parser(html)
+        job_post = {}
+        for field, css in self._field_css.items():
+            node = tree.css_first(css)
+            job_post[field] = node.text().strip() if node is not None else ""
+        link = tree.css_first(self._apply_css)
+        job_post["apply_link"] = (link.attributes.get("href") or "") if link is not None else ""
+        return job_post
+
+    def extract_job_ids(self, html: str) -> List[str]:
+        ids = [
+            job_id_from_urn(card.attributes.get(JOB_CARD_URN_ATTR))
+            for card in self._parser(html).css(self._card_css)
+        ]
+        return [job_id for job_id in ids if job_id]
+
+
+EXTRACTORS = {
+    "selectolax": SelectolaxExtractor,
+    "lxml": LxmlExtractor,
+    "soup": SoupExtractor,
+}
+
+_extractors: Dict[str, object] = {}
+_extractors_lock = threading.Lock()
+
+
+def get_extractor(name: Optional[str] = None):
+    """
+    Return a (cached) extractor backend.
+
+    Args:
+        name (str): "selectolax", "lxml", "soup" or "auto". Defaults to JOB_HTML_PARSER or "auto".
+            "auto" picks the first installed backend in that order.
+    """
+    name = name or os.getenv("JOB_HTML_PARSER", "auto")
+    if name in _extractors:
+        return _extractors[name]
+    with _extractors_lock:
+        if name not in _extractors:
+            candidates = list(EXTRACTORS) if name == "auto" else [name]
+            for candidate in candidates:
+                try:
+                    _extractors[name] = EXTRACTORS[candidate]()
+                    break
+                except ImportError:
+                    continue
+            else:
+                raise ImportError(f"No HTML extractor backend available for {name!r}")
+    return _extractors[name]
+
+
+def extract_job(html: str) -> Dict[str, str]:
+    """
+    Extract job posting fields with the configured backend.
+    Module-level so it can be sent to a process pool.
+    """
+    return get_extractor().extract_job(html)
+
+
+def extract_job_ids(html: str) -> List[str]:
+    """
+    Extract job IDs from a search results page with the configured backend.
+    """
+    return get_extractor().extract_job_ids(html)
@@ -0,0 +1,166 @@
+# 异步抓取引擎：并发上限、按主机限速、429/5xx 抖动退避重试、单请求超时
+import asyncio
+import os
+import random
+import threading
+import time
+from typing import Dict, Optional
+from urllib.parse import urlparse
+
+import aiohttp
+
+# 这些状态码视为暂时性错误，需要退避后重试
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+
+class TokenBucket:
+    """
+    Token-bucket rate limiter that can be awaited from any event loop.
+
+    Attributes:
+        rate (float): Tokens added per second.
+        capacity (float): Maximum burst size.
+    """
+
+    def __init__(self, rate: float, capacity: float) -> None:
+        self.rate = rate
+        self.capacity = capacity
+        self._tokens = capacity
+        self._updated = time.monotonic()
+        # 线程锁只保护计数，等待在锁外进行，因此不绑定某个事件循环
+        self._lock = threading.Lock()
+
+    async def acquire(self) -> None:
+        """
+        Wait until a token is available and take it.
+        """
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(
+                    self.capacity, self._tokens + (now - self._updated) * self.rate
+                )
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                wait = (1 - self._tokens) / self.rate
+            await asyncio.sleep(wait)
+
+
+class HostRateLimiter:
+    """
+    Per-host token buckets shared by every fetcher in the process.
+
+    Attributes:
+        rate (float): Requests per second allowed for each host.
+        burst (int): Token-bucket capacity for each host.
+    """
+
+    def __init__(self, rate: Optional[float] = None, burst: Optional[int] = None) -> None:
+        self.rate = rate or float(os.getenv("JOB_FETCH_RATE", "3"))
+        self.burst = burst or int(os.getenv("JOB_FETCH_BURST", "5"))
+        self._buckets: Dict[str, TokenBucket] = {}
+        self._lock = threading.Lock()
+
+    def bucket(self, url: str) -> TokenBucket:
+        host = urlparse(url).netloc
+        bucket = self._buckets.get(host)
+        if bucket is None:
+            with self._lock:
+                bucket = self._buckets.setdefault(host, TokenBucket(self.rate, self.burst))
+        return bucket
+
+
+_host_rate_limiter: Optional[HostRateLimiter] = None
+_host_rate_limiter_lock = threading.Lock()
+
+
+def get_host_rate_limiter() -> HostRateLimiter:
+    """
+    Return the process-wide HostRateLimiter.
+
+    Like the shared aiohttp session, it outlives single searches, so concurrent
+    searches from all sessions together stay within each host's rate.
+    """
+    global _host_rate_limiter
+    if _host_rate_limiter is None:
+        with _host_rate_limiter_lock:
+            if _host_rate_limiter is None:
+                _host_rate_limiter = HostRateLimiter()
+    return _host_rate_limiter
+
+
+class FetchError(Exception):
+    """Raised when a URL could not be fetched after all retries."""
+
+
+class AsyncFetcher:
+    """
+    Fetch URLs with bounded concurrency, per-host rate limiting and retries.
+
+    Attributes:
+        session (aiohttp.ClientSession): Session used for all requests.
+        concurrency (int): Maximum number of requests in flight.
+        limiter (HostRateLimiter): Per-host rate limiter, the process-wide one by default.
+        timeout (float): Total timeout of a single request, in seconds.
+        retries (int): Retries after the first attempt on 429/5xx, timeouts and connection errors.
+        backoff (float): Base delay of the exponential backoff, in seconds.
+        max_retry_after (float): Upper bound of a server-requested Retry-After wait, in seconds.
+    """
+
+    def __init__(
+        self,
+        session: aiohttp.ClientSession,
+        concurrency: Optional[int] = None,
+        limiter: Optional[HostRateLimiter] = None,
+        timeout: Optional[float] = None,
+        retries: Optional[int] = None,
+        backoff: Optional[float] = None,
+        max_retry_after: Optional[float] = None,
+    ) -> None:
+        self.session = session
+        self.concurrency = concurrency or int(os.getenv("JOB_FETCH_CONCURRENCY", "5"))
+        self.limiter = limiter or get_host_rate_limiter()
+        self.timeout = timeout or float(os.getenv("JOB_FETCH_TIMEOUT", "15"))
+        self.retries = retries if retries is not None else int(os.getenv("JOB_FETCH_RETRIES", "3"))
+        self.backoff = backoff or float(os.getenv("JOB_FETCH_BACKOFF", "0.5"))
+        self.max_retry_after = max_retry_after or float(os.getenv("JOB_FETCH_MAX_RETRY_AFTER", "30"))
+        self._semaphore = asyncio.Semaphore(self.concurrency)
+
+    def _delay(self, attempt: int, retry_after: Optional[str] = None) -> float:
+        if retry_after and retry_after.isdigit():
+            # 服务端要求的等待时间设上限，避免一个请求长时间占住搜索
+            return min(float(retry_after), self.max_retry_after)
+        # full jitter: 在 [0, backoff * 2^attempt] 内随机
+        return random.uniform(0, self.backoff * (2 ** attempt))
+
+    async def fetch_text(self, url: str, **kwargs) -> str:
+        """
+        GET a URL and return the response body as text.
+
+        Raises:
+            FetchError: If the request still fails after all retries.
+        """
+        last_error = None
+        for attempt in range(self.retries + 1):
+            retry_after = None
+            async with self._semaphore:
+                await self.limiter.bucket(url).acquire()
+                try:
+                    async with self.session.get(
+                        url,
+                        timeout=aiohttp.ClientTimeout(total=self.timeout),
+                        **kwargs,
+                    ) as response:
+                        if response.status not in RETRY_STATUSES:
+                            response.raise_for_status()
+                            return await response.text()
+                        retry_after = response.headers.get("Retry-After")
+                        last_error = f"HTTP {response.status}"
+                except (asyncio.TimeoutError, aiohttp.ClientConnectionError) as exc:
+                    last_error = repr(exc)
+            # 退避等待时释放并发名额，让其他请求继续
+            if attempt < self.retries:
+                await asyncio.sleep(self._delay(attempt, retry_after))
+        raise FetchError(f"Failed to fetch {url} after {self.retries + 1} attempts: {last_error}")
@@ -0,0 +1,169 @@
+# 对话历史压缩：按节点的 token 预算裁剪历史，旧轮次滚动摘要，已存入状态的冗长输出替换为占位说明
+import os
+import re
+from typing import Callable, List, Optional, Tuple
+
+from langchain_core.messages import BaseMessage, HumanMessage, SystemMessage
+
+# 每个节点发送给 LLM 的历史消息 token 上限
+NODE_TOKEN_BUDGETS = {
+    "Supervisor": 2000,
+    "ResumeAnalyzer": 1500,
+    "JobSearcher": 3000,
+    "WebResearcher": 3000,
+    "CoverLetterGenerator": 6000,
+    "ChatBot": 6000,
+}
+DEFAULT_TOKEN_BUDGET = int(os.getenv("HISTORY_TOKEN_BUDGET", "4000"))
+
+# 这些 agent 的输出已经保存到状态中对应的键，旧轮次里只需保留一个占位说明
+STORED_OUTPUTS = {
+    "JobSearcher": "job_info",
+    "CoverLetterGenerator": "cover_letter",
+    "ResumeAnalyzer": "resume_text",
+}
+
+SUMMARY_SHARE = 0.2  # 滚动摘要最多占预算的比例
+SUMMARY_LINE_CHARS = 160
+
+_CJK = re.compile(r"[一-鿿]")
+_encoder = None
+
+
+def count_tokens(text: str) -> int:
+    """
+    Count tokens with tiktoken (cl100k_base) when installed, otherwise estimate
+    (about 4 characters per token, one token per CJK character).
+    """
+    global _encoder
+    if _encoder is None:
+        try:
+            import tiktoken
+
+            _encoder = tiktoken.get_encoding("cl100k_base")
+        except Exception:
+            _encoder = False
+    if _encoder:
+        return len(_encoder.encode(text, disallowed_special=()))
+    cjk = len(_CJK.findall(text))
+    return cjk + (len(text) - cjk + 3) // 4
+
+
+def message_tokens(message: BaseMessage) -> int:
+    # 每条消息额外约 4 个 token 的角色/格式开销
+    return count_tokens(str(message.content)) + 4
+
+
+def _is_user_message(message: BaseMessage) -> bool:
+    # agent 的输出也以 HumanMessage 形式写回，但带有 name
+    return isinstance(message, HumanMessage) and not message.name
+
+
+def _stub_stored_output(message: BaseMessage, state: dict) -> BaseMessage:
+    key = STORED_OUTPUTS.get(message.name or "")
+    if not key or not state.get(key) or len(str(message.content)) < 300:
+        return message
+    return message.__class__(
+        content=f"[{message.name} output ({len(str(message.content))} chars) is stored in state as `{key}`]",
+        name=message.name,
+    )
+
+
+def summarize_messages(messages: List[BaseMessage]) -> str:
+    """
+    Extractive summary: one short line per message.
+    """
+    lines = []
+    for message in messages:
+        speaker = message.name or ("User" if _is_user_message(message) else message.type)
+        text = " ".join(str(message.content).split())
+        if len(text) > SUMMARY_LINE_CHARS:
+            text = text[:SUMMARY_LINE_CHARS] + "..."
+        lines.append(f"- {speaker}: {text}")
+    return "\n".join(lines)
+
+
+def compact_messages(
+    messages: List[BaseMessage],
+    budget: int,
+    state: Optional[dict] = None,
+    summary_state: Optional[dict] = None,
+    summarizer: Callable[[List[BaseMessage]], str] = summarize_messages,
+) -> Tuple[List[BaseMessage], Optional[dict]]:
+    """
+    Fit a message history into a token budget.
+
+    The current turn (from the latest user message on) is always kept verbatim.
+    Older agent outputs whose results are stored in state are replaced by a stub,
+    then the newest older messages are kept while they fit, and everything before
+    them is folded into a rolling summary message.
+
+    Args:
+        messages (List[BaseMessage]): The full, append-only message history.
+        budget (int): Token budget for the returned messages.
+        state (dict): Agent state, used to detect outputs already stored in state.
+        summary_state (dict): Previous rolling summary {"covered": int, "text": str}.
+        summarizer (Callable): Turns a list of messages into summary text.
+
+    Returns:
+        Tuple of the compacted messages and the updated rolling summary state.
+    """
+    state = state or {}
+    turn_start = next(
+        (index for index in range(len(messages) - 1, -1, -1) if _is_user_message(messages[index])),
+        0,
+    )
+    older = [_stub_stored_output(message, state) for message in messages[:turn_start]]
+    current_turn = list(messages[turn_start:])
+
+    remaining = budget - sum(message_tokens(message) for message in current_turn)
+    summary_budget = int(budget * SUMMARY_SHARE)
+    if sum(message_tokens(message) for message in older) <= remaining:
+        return older + current_turn, summary_state
+
+    # 从最新的旧消息往前保留，直到用完（扣除摘要预留后的）预算
+    kept_from = len(older)
+    used = 0
+    while kept_from > 0:
+        cost = message_tokens(older[kept_from - 1])
+        if used + cost > remaining - summary_budget:
+            break
+        used += cost
+        kept_from -= 1
+
+    # 滚动摘要：只对上次摘要之后新被挤出的消息做摘要
+    summary_state = dict(summary_state or {"covered": 0, "text": ""})
+    if kept_from > summary_state["covered"]:
+        addition = summarizer(older[summary_state["covered"]:kept_from])
+        summary_state["text"] = "\n".join(filter(None, [summary_state["text"], addition]))
+        summary_state["covered"] = kept_from
+    summary_text = summary_state["text"]
+    while summary_text and count_tokens(summary_text) > summary_budget:
+        # 超出预算时丢弃最早的摘要行
+        summary_text = summary_text.split("\n", 1)[1] if "\n" in summary_text else ""
+    summary_state["text"] = summary_text
+
+    compacted = older[summary_state["covered"]:]
+    if summary_text:
+        compacted = [SystemMessage(content=f"Summary of the earlier conversation:\n{summary_text}")] + compacted
+    return compacted + current_turn, summary_state
+
+
+def compact_for_node(state: dict, node_name: str) -> List[BaseMessage]:
+    """
+    Return the node's view of state["messages"] within its token budget and
+    store the node's updated rolling summary in state["history_summary"][node_name].
+    """
+    budget = NODE_TOKEN_BUDGETS.get(node_name, DEFAULT_TOKEN_BUDGET)
+    # 各节点预算不同，滚动摘要按节点分别保存
+    summaries = dict(state.get("history_summary") or {})
+    messages, summary_state = compact_messages(
+        state.get("messages", []),
+        budget,
+        state=state,
+        summary_state=summaries.get(node_name),
+    )
+    if summary_state is not None:
+        summaries[node_name] = summary_state
+        state["history_summary"] = summaries
+    return messages
@@ -0,0 +1,76 @@
+# 增量意图识别：只对最新一条用户消息做一次关键词匹配（所有路由关键词预编译为一个正则），结果缓存在状态中
+import hashlib
+import re
+from typing import FrozenSet, List, Optional
+
+from langchain_core.messages import BaseMessage, HumanMessage
+
+# 路由关键词（英文 + 中文），按意图分组
+INTENT_KEYWORDS = {
+    "cover_letter": ["求职信", "cover letter", "生成信"],
+    "letter": ["letter"],
+    "job_search": ["职位", "工作", "job", "search"],
+    "research": ["研究", "调研", "research"],
+    "summary": ["summarize", "summary", "summarise", "brief", "overview", "总结", "概括"],
+    "resume": ["resume", "cv", "简历"],
+}
+
+_KEYWORD_INTENTS = {}
+for _intent, _keywords in INTENT_KEYWORDS.items():
+    for _keyword in _keywords:
+        _KEYWORD_INTENTS.setdefault(_keyword.lower(), set()).add(_intent)
+
+# 长关键词优先，"research" 不会再被当成 "search"，"cover letter" 不会拆成 "letter"
+_KEYWORD_PATTERN = re.compile(
+    "|".join(re.escape(keyword) for keyword in sorted(_KEYWORD_INTENTS, key=len, reverse=True)),
+    re.IGNORECASE,
+)
+
+
+def classify(text: str) -> FrozenSet[str]:
+    """
+    Return the intents whose keywords occur in `text`, in a single scan.
+    """
+    intents = set()
+    for match in _KEYWORD_PATTERN.finditer(text):
+        intents |= _KEYWORD_INTENTS[match.group(0).lower()]
+    return frozenset(intents)
+
+
+def latest_user_message(messages: List[BaseMessage]) -> Optional[int]:
+    """
+    Return the index of the newest message typed by the user.
+
+    Agent outputs are also written back as HumanMessage but carry a name, so they
+    are skipped.
+    """
+    for index in range(len(messages) - 1, -1, -1):
+        message = messages[index]
+        if isinstance(message, HumanMessage) and not message.name:
+            return index
+    return None
+
+
+def get_intents(state: dict) -> FrozenSet[str]:
+    """
+    Return the intents of the newest user message, classifying it only once.
+
+    The result is cached in state["intent"] together with the message index and a
+    hash of its content, so repeated Supervisor/ChatBot calls in the same turn
+    reuse it.
+    """
+    messages = state.get("messages", [])
+    index = latest_user_message(messages)
+    if index is None:
+        text = state.get("user_input", "")
+    else:
+        text = str(messages[index].content)
+    digest = hashlib.sha1(text.encode()).hexdigest()
+
+    cached = state.get("intent")
+    if cached and cached.get("index") == index and cached.get("digest") == digest:
+        return cached["intents"]
+
+    intents = classify(text)
+    state["intent"] = {"index": index, "digest": digest, "intents": intents}
+    return intents
@@ -0,0 +1,150 @@
+# 基于 SQLite 的职位详情缓存：按 job_id 存储，支持 TTL、按大小淘汰和命中统计
+import json
+import os
+import sqlite3
+import threading
+import time
+from typing import Dict, Iterable, Optional
+
+
+class JobPostingCache:
+    """
+    Disk-backed TTL cache of parsed job postings, keyed by (source, job ID).
+
+    Entries older than `ttl` seconds are treated as missing. When the stored data grows
+    beyond `max_bytes`, the least recently used entries are evicted.
+
+    Attributes:
+        path (str): SQLite database file.
+        ttl (float): Seconds an entry stays fresh.
+        max_bytes (int): Size budget of the stored postings.
+        hits (int): Number of IDs served from the cache.
+        misses (int): Number of IDs that were missing or stale.
+    """
+
+    def __init__(
+        self,
+        path: Optional[str] = None,
+        ttl: Optional[float] = None,
+        max_bytes: Optional[int] = None,
+    ) -> None:
+        self.path = path or os.getenv("JOB_CACHE_PATH", os.path.join("temp", "job_cache.sqlite3"))
+        self.ttl = ttl if ttl is not None else float(os.getenv("JOB_CACHE_TTL", str(6 * 3600)))
+        self.max_bytes = max_bytes or int(os.getenv("JOB_CACHE_MAX_BYTES", str(50 * 1024 * 1024)))
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._conn = sqlite3.connect(self.path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS job_postings (
+                source TEXT NOT NULL,
+                job_id TEXT NOT NULL,
+                data TEXT NOT NULL,
+                size INTEGER NOT NULL,
+                fetched_at REAL NOT NULL,
+                accessed_at REAL NOT NULL,
+                PRIMARY KEY (source, job_id)
+            )
+            """
+        )
+        self._conn.commit()
+
+    def get_many(self, job_ids: Iterable[str], source: str = "guest") -> Dict[str, dict]:
+        """
+        Return the fresh cached postings for the given IDs, keyed by job ID.
+        """
+        job_ids = [str(job_id) for job_id in job_ids]
+        if not job_ids:
+            return {}
+        now = time.time()
+        placeholders = ",".join("?" * len(job_ids))
+        with self._lock:
+            rows = self._conn.execute(
+                f"SELECT job_id, data FROM job_postings WHERE source = ? "
+                f"AND job_id IN ({placeholders}) AND fetched_at >= ?",
+                [source, *job_ids, now - self.ttl],
+            ).fetchall()
+            found = {job_id: json.loads(data) for job_id, data in rows}
+            if found:
+                self._conn.executemany(
+                    "UPDATE job_postings SET accessed_at = ? WHERE source = ? AND job_id = ?",
+                    [(now, source, job_id) for job_id in found],
+                )
+                self._conn.commit()
+            self.hits += len(found)
+            self.misses += len(set(job_ids) - set(found))
+        return found
+
+    def put_many(self, postings: Dict[str, dict], source: str = "guest") -> None:
+        """
+        Store postings keyed by job ID and evict old entries if over the size budget.
+        """
+        if not postings:
+            return
+        now = time.time()
+        rows = []
+        for job_id, posting in postings.items():
+            data = json.dumps(posting, ensure_ascii=False)
+            rows.append((source, str(job_id), data, len(data.encode()), now, now))
+        with self._lock:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO job_postings VALUES (?, ?, ?, ?, ?, ?)", rows
+            )
+            self._evict()
+            self._conn.commit()
+
+    def _evict(self) -> None:
+        # 先删除过期条目，再按最近访问时间淘汰直到低于大小上限
+        self._conn.execute(
+            "DELETE FROM job_postings WHERE fetched_at < ?", (time.time() - self.ttl,)
+        )
+        total = self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM job_postings").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        rows = self._conn.execute(
+            "SELECT source, job_id, size FROM job_postings ORDER BY accessed_at"
+        ).fetchall()
+        expired = []
+        for source, job_id, size in rows:
+            if total <= self.max_bytes:
+                break
+            expired.append((source, job_id))
+            total -= size
+        self._conn.executemany(
+            "DELETE FROM job_postings WHERE source = ? AND job_id = ?", expired
+        )
+
+    def stats(self) -> dict:
+        """
+        Return hit/miss counters and the current number of entries.
+        """
+        with self._lock:
+            entries = self._conn.execute("SELECT COUNT(*) FROM job_postings").fetchone()[0]
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "entries": entries,
+        }
+
+
+_cache: Optional[JobPostingCache] = None
+_cache_lock = threading.Lock()
+
+
+def get_job_cache() -> JobPostingCache:
+    """
+    Return the process-wide JobPostingCache.
+    """
+    global _cache
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                _cache = JobPostingCache()
+    return _cache
@@ -0,0 +1,152 @@
+# 长连接的 LinkedIn API 客户端管理器：一次登录，cookie 持久化到磁盘，过期时自动重新登录
+import asyncio
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from typing import Any, Optional
+
+from linkedin_api import Linkedin
+from linkedin_api.client import ChallengeException, UnauthorizedException
+
+# 认证失效时 LinkedIn 返回的状态码
+AUTH_ERROR_STATUSES = (401, 403)
+
+
+def is_auth_error(exc: Exception) -> bool:
+    """
+    Return True if `exc` means the session is no longer authenticated.
+
+    Network errors, timeouts and other failures return False; they are not fixed
+    by logging in again.
+    """
+    if isinstance(exc, (UnauthorizedException, ChallengeException)):
+        return True
+    response = getattr(exc, "response", None)
+    return getattr(response, "status_code", None) in AUTH_ERROR_STATUSES
+
+
+class LinkedInClientManager:
+    """
+    Owns a single authenticated linkedin_api client for the whole process.
+
+    linkedin_api stores session cookies in `cookies_dir` and reuses them on the next
+    construction while they are still valid, so a restart with a saved session costs no
+    login at all. Blocking API calls run on a bounded thread pool instead of spawning a
+    thread per call.
+
+    Attributes:
+        cookies_dir (str): Directory where the session cookies are persisted.
+        max_workers (int): Maximum number of concurrent LinkedIn API calls.
+        logins (int): Number of client constructions (cookie restore or fresh login).
+    """
+
+    def __init__(
+        self,
+        email: Optional[str] = None,
+        password: Optional[str] = None,
+        cookies_dir: Optional[str] = None,
+        max_workers: Optional[int] = None,
+    ) -> None:
+        self.email = email
+        self.password = password
+        self.cookies_dir = cookies_dir or os.getenv(
+            "LINKEDIN_COOKIES_DIR", os.path.join("temp", "linkedin_cookies")
+        )
+        self.max_workers = max_workers or int(os.getenv("LINKEDIN_API_WORKERS", "4"))
+        self.logins = 0
+        self._client: Optional[Linkedin] = None
+        self._lock = threading.Lock()
+        self._executor: Optional[ThreadPoolExecutor] = None
+
+    def _credentials(self):
+        return (
+            self.email or os.getenv("LINKEDIN_EMAIL"),
+            self.password or os.getenv("LINKEDIN_PASS"),
+        )
+
+    def _authenticate(self, refresh_cookies: bool = False) -> Linkedin:
+        email, password = self._credentials()
+        os.makedirs(self.cookies_dir, exist_ok=True)
+        client = Linkedin(
+            email,
+            password,
+            refresh_cookies=refresh_cookies,
+            cookies_dir=self.cookies_dir,
+        )
+        self.logins += 1
+        return client
+
+    def get_client(self) -> Linkedin:
+        """
+        Return the shared client, authenticating on first use.
+        """
+        if self._client is None:
+            with self._lock:
+                if self._client is None:
+                    self._client = self._authenticate()
+        return self._client
+
+    def reauthenticate(self, stale_client: Optional[Linkedin] = None) -> Linkedin:
+        """
+        Force a fresh login, ignoring saved cookies.
+
+        If another thread already replaced `stale_client`, its new client is reused.
+        """
+        with self._lock:
+            if self._client is None or self._client is stale_client:
+                self._client = self._authenticate(refresh_cookies=True)
+        return self._client
+
+    def call(self, method: str, *args, **kwargs) -> Any:
+        """
+        Call a linkedin_api method, re-authenticating once if the session expired.
+
+        Only authentication failures trigger a new login; other errors are raised to
+        the caller, since a fresh login is slow and rate-limited by LinkedIn.
+        """
+        client = self.get_client()
+        try:
+            result = getattr(client, method)(*args, **kwargs)
+            if not (isinstance(result, dict) and result.get("status") in AUTH_ERROR_STATUSES):
+                return result
+        except Exception as exc:
+            if not is_auth_error(exc):
+                raise
+            print(f"LinkedIn API call {method} failed, re-authenticating -> {exc}")
+        client = self.reauthenticate(client)
+        return getattr(client, method)(*args, **kwargs)
+
+    def _get_executor(self) -> ThreadPoolExecutor:
+        if self._executor is None:
+            with self._lock:
+                if self._executor is None:
+                    self._executor = ThreadPoolExecutor(
+                        max_workers=self.max_workers, thread_name_prefix="linkedin-api"
+                    )
+        return self._executor
+
+    async def acall(self, method: str, *args, **kwargs) -> Any:
+        """
+        Run `call` on the bounded worker pool and await the result.
+        """
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(
+            self._get_executor(), partial(self.call, method, *args, **kwargs)
+        )
+
+
+_manager: Optional[LinkedInClientManager] = None
+_manager_lock = threading.Lock()
+
+
+def get_linkedin_client_manager() -> LinkedInClientManager:
+    """
+    Return the process-wide LinkedInClientManager.
+    """
+    global _manager
+    if _manager is None:
+        with _manager_lock:
+            if _manager is None:
+                _manager = LinkedInClientManager()
+    return _manager
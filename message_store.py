@@ -0,0 +1,188 @@
+# 追加写入的对话历史：记录已持久化的消息数，每轮只写入新增的消息；可选 SQLite 后端，历史可跨 Streamlit 会话保存
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from typing import Callable, Dict, List, Mapping, Optional, Sequence
+
+from langchain_core.chat_history import BaseChatMessageHistory
+from langchain_core.messages import BaseMessage, message_to_dict, messages_from_dict
+
+
+class MessageDatabase:
+    """
+    SQLite database shared by all chat histories stored in the same file.
+
+    Attributes:
+        path (str): SQLite database file.
+    """
+
+    def __init__(self, path: str) -> None:
+        self.path = path
+        self.lock = threading.Lock()
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.conn = sqlite3.connect(self.path, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS chat_messages (
+                session_id TEXT NOT NULL,
+                idx INTEGER NOT NULL,
+                data TEXT NOT NULL,
+                created_at REAL NOT NULL,
+                PRIMARY KEY (session_id, idx)
+            )
+            """
+        )
+        self.conn.commit()
+
+
+class SQLiteMessageHistory(BaseChatMessageHistory):
+    """
+    Chat history of one session stored in SQLite, one row per message.
+
+    Messages are only loaded when `messages` is read, so histories do not have to
+    stay in memory between turns, and appending writes only the new rows.
+
+    Attributes:
+        session_id (str): Key of the conversation.
+        db (MessageDatabase): Database holding the messages.
+    """
+
+    def __init__(self, session_id: str, db: MessageDatabase) -> None:
+        self.session_id = session_id
+        self.db = db
+        self._count: Optional[int] = None
+
+    def __len__(self) -> int:
+        if self._count is None:
+            with self.db.lock:
+                self._count = self.db.conn.execute(
+                    "SELECT COUNT(*) FROM chat_messages WHERE session_id = ?", (self.session_id,)
+                ).fetchone()[0]
+        return self._count
+
+    @property
+    def messages(self) -> List[BaseMessage]:
+        with self.db.lock:
+            rows = self.db.conn.execute(
+                "SELECT data FROM chat_messages WHERE session_id = ? ORDER BY idx",
+                (self.session_id,),
+            ).fetchall()
+        self._count = len(rows)
+        return messages_from_dict([json.loads(data) for data, in rows])
+
+    def add_messages(self, messages: Sequence[BaseMessage]) -> None:
+        if not messages:
+            return
+        start = len(self)
+        now = time.time()
+        rows = [
+            (self.session_id, start + offset, json.dumps(message_to_dict(message), ensure_ascii=False), now)
+            for offset, message in enumerate(messages)
+        ]
+        with self.db.lock:
+            self.db.conn.executemany("INSERT INTO chat_messages VALUES (?, ?, ?, ?)", rows)
+            self.db.conn.commit()
+        self._count = start + len(rows)
+
+    def clear(self) -> None:
+        with self.db.lock:
+            self.db.conn.execute("DELETE FROM chat_messages WHERE session_id = ?", (self.session_id,))
+            self.db.conn.commit()
+        self._count = 0
+
+
+class AppendOnlyMessageHistory:
+    """
+    Persists a growing transcript by writing only the messages added since the last save.
+
+    The graph returns the full message list every turn; `save` compares it with the
+    number of messages already persisted and appends only the delta, instead of
+    clearing and rewriting the whole history.
+
+    Attributes:
+        store (BaseChatMessageHistory): Backend the messages are written to.
+    """
+
+    def __init__(self, store: BaseChatMessageHistory) -> None:
+        self.store = store
+
+    @property
+    def messages(self) -> List[BaseMessage]:
+        return self.store.messages
+
+    def persisted_count(self) -> int:
+        # SQLite 后端自己维护计数，其它后端（如 Streamlit）的消息本来就在内存列表里
+        if hasattr(self.store, "__len__"):
+            return len(self.store)
+        return len(self.store.messages)
+
+    def save(self, messages: Sequence[BaseMessage]) -> int:
+        """
+        Append the messages after the last persisted index and return how many were written.
+        """
+        persisted = self.persisted_count()
+        if len(messages) < persisted:
+            # 历史被截断过（不是在原历史上追加），只能整体重写
+            self.store.clear()
+            persisted = 0
+        new_messages = list(messages[persisted:])
+        if new_messages:
+            self.store.add_messages(new_messages)
+        return len(new_messages)
+
+    def clear(self) -> None:
+        self.store.clear()
+
+
+_databases: Dict[str, MessageDatabase] = {}
+_databases_lock = threading.Lock()
+
+
+def get_message_database(path: str) -> MessageDatabase:
+    """
+    Return the process-wide MessageDatabase for the given file.
+    """
+    with _databases_lock:
+        if path not in _databases:
+            _databases[path] = MessageDatabase(path)
+        return _databases[path]
+
+
+def chat_session_id(user: Optional[Mapping] = None) -> str:
+    """
+    Return the key a chat history is stored under. It is always derived on the server.
+
+    A logged-in user (st.user with Streamlit authentication) gets a stable key derived
+    from the identity verified by the OIDC provider, so the persisted history survives
+    a reload for that user only. Anyone else gets a random key that lives as long as the
+    Streamlit session. A key is never taken from the request (e.g. a URL parameter),
+    otherwise anyone holding a link could read that history.
+    """
+    user = user or {}
+    if user.get("is_logged_in") and user.get("sub"):
+        identity = f"{user.get('iss', '')}:{user['sub']}"
+        return "user-" + hashlib.sha256(identity.encode()).hexdigest()
+    return uuid.uuid4().hex
+
+
+def create_message_history(
+    session_id: str,
+    fallback: Callable[[], BaseChatMessageHistory],
+) -> AppendOnlyMessageHistory:
+    """
+    Return the append-only history of a session.
+
+    When CHAT_HISTORY_DB is set, messages are stored in that SQLite file and outlive
+    the Streamlit session; otherwise the `fallback` backend is used.
+    """
+    path = os.getenv("CHAT_HISTORY_DB")
+    if path:
+        return AppendOnlyMessageHistory(SQLiteMessageHistory(session_id, get_message_database(path)))
+    return AppendOnlyMessageHistory(fallback())
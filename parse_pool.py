@@ -0,0 +1,62 @@
+# 把 HTML 解析从事件循环中移到进程池 / 线程池，网络 I/O 与 CPU 解析并行
+import asyncio
+import multiprocessing
+import os
+import threading
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Any, Callable, Optional
+
+from extractors import get_extractor
+
+# 解析时会释放 GIL 的后端，用线程池即可，省去进程间传输 HTML 的开销
+GIL_RELEASING_BACKENDS = {"lxml", "selectolax"}
+
+_executor: Optional[Executor] = None
+_executor_lock = threading.Lock()
+
+
+def get_parse_mode() -> str:
+    """
+    Return the parse executor mode: "process", "thread" or "inline".
+
+    JOB_PARSE_EXECUTOR overrides the default ("auto"), which uses threads for parsers
+    that release the GIL and processes for BeautifulSoup.
+    """
+    mode = os.getenv("JOB_PARSE_EXECUTOR", "auto")
+    if mode == "auto":
+        return "thread" if get_extractor().name in GIL_RELEASING_BACKENDS else "process"
+    return mode
+
+
+def get_parse_executor() -> Optional[Executor]:
+    """
+    Return the shared parse executor, or None when parsing runs inline.
+    """
+    global _executor
+    mode = get_parse_mode()
+    if mode == "inline":
+        return None
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                workers = int(os.getenv("JOB_PARSE_WORKERS", "0")) or os.cpu_count() or 2
+                if mode == "process":
+                    # spawn：Streamlit 进程里有多个线程，fork 不安全
+                    _executor = ProcessPoolExecutor(
+                        max_workers=workers, mp_context=multiprocessing.get_context("spawn")
+                    )
+                else:
+                    _executor = ThreadPoolExecutor(
+                        max_workers=workers, thread_name_prefix="html-parse"
+                    )
+    return _executor
+
+
+async def run_parser(func: Callable[[str], Any], html: str) -> Any:
+    """
+    Run a module-level parse function on the parse executor and await the result.
+    """
+    executor = get_parse_executor()
+    if executor is None:
+        return func(html)
+    return await asyncio.get_running_loop().run_in_executor(executor, func, html)
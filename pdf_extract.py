@@ -0,0 +1,103 @@
+# 按页并行的 PDF 文本提取：文件内存映射，长文档的页面分块交给进程池，按页序返回
+import mmap
+import os
+import threading
+from contextlib import contextmanager
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import get_context
+from typing import Iterator, List, Optional
+
+_executor: Optional[ProcessPoolExecutor] = None
+_executor_lock = threading.Lock()
+
+
+@contextmanager
+def _open_pdf(path: str):
+    """
+    Yield an open PyMuPDF document backed by a read-only memory map of the file.
+    """
+    import fitz  # PyMuPDF
+
+    with open(path, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+        view = memoryview(mm)
+        try:
+            try:
+                pdf = fitz.open(stream=view, filetype="pdf")
+            except TypeError:
+                # 旧版 PyMuPDF 不接受 memoryview，退回按路径打开
+                pdf = fitz.open(path)
+            try:
+                yield pdf
+            finally:
+                pdf.close()
+        finally:
+            view.release()
+
+
+def page_count(path: str) -> int:
+    with _open_pdf(path) as pdf:
+        return pdf.page_count
+
+
+def extract_page_range(path: str, start: int, stop: int) -> List[str]:
+    """
+    Extract the text of pages [start, stop). Module-level so it runs in worker processes.
+    """
+    with _open_pdf(path) as pdf:
+        return [pdf[index].get_text("text") for index in range(start, stop)]
+
+
+def pdf_workers() -> int:
+    return int(os.getenv("PDF_EXTRACT_WORKERS", "0")) or os.cpu_count() or 2
+
+
+def get_pdf_executor() -> ProcessPoolExecutor:
+    global _executor
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                _executor = ProcessPoolExecutor(
+                    max_workers=pdf_workers(), mp_context=get_context("spawn")
+                )
+    return _executor
+
+
+def iter_pdf_pages(
+    path: str,
+    parallel_min_pages: Optional[int] = None,
+    chunk_size: Optional[int] = None,
+) -> Iterator[str]:
+    """
+    Yield the text of each page of a PDF, in page order.
+
+    Short documents are extracted serially. Longer ones are split into page chunks
+    that are extracted in parallel on a process pool; pages are yielded in order.
+
+    Args:
+        path (str): Path to the PDF file.
+        parallel_min_pages (int): Minimum page count for parallel extraction
+            (PDF_PARALLEL_MIN_PAGES, default 8).
+        chunk_size (int): Pages per worker task. Defaults to spreading the document
+            over about two tasks per worker, capped at 4 pages.
+    """
+    total = page_count(path)
+    parallel_min_pages = parallel_min_pages or int(os.getenv("PDF_PARALLEL_MIN_PAGES", "8"))
+    if total < parallel_min_pages:
+        with _open_pdf(path) as pdf:
+            for page in pdf:
+                yield page.get_text("text")
+        return
+
+    executor = get_pdf_executor()
+    if not chunk_size:
+        chunk_size = max(1, min(4, -(-total // (pdf_workers() * 2))))
+    futures = [
+        executor.submit(extract_page_range, path, start, min(start + chunk_size, total))
+        for start in range(0, total, chunk_size)
+    ]
+    try:
+        for future in futures:
+            yield from future.result()
+    finally:
+        for future in futures:
+            future.cancel()
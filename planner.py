@@ -0,0 +1,76 @@
+# 规划模式：把包含多个子任务的请求拆成 Agent 任务 DAG，没有依赖关系的任务通过 LangGraph Send 并行执行
+import os
+from typing import Dict, List
+
+from intent import get_intents, latest_user_message
+
+# 设置为 0 关闭规划模式，退回 Supervisor -> 单个 Agent -> Supervisor 的串行循环
+PLANNING_MODE = os.getenv("SUPERVISOR_PLANNING_MODE", "1") == "1"
+
+
+def plan_tasks(state: dict) -> Dict[str, List[str]]:
+    """
+    Build the task DAG for the newest user message as {worker: [workers it depends on]}.
+
+    Returns an empty dict when the request needs fewer than two workers, in which
+    case the Supervisor routes it as usual.
+    """
+    intents = get_intents(state)
+    tasks: Dict[str, List[str]] = {}
+    needs_resume = bool(intents & {"resume", "cover_letter"}) and not state.get("resume_text")
+    if needs_resume:
+        tasks["ResumeAnalyzer"] = []
+    if "job_search" in intents or (
+        "cover_letter" in intents and len(state.get("job_info") or "") <= 10
+    ):
+        tasks["JobSearcher"] = []
+    if "research" in intents:
+        tasks["WebResearcher"] = []
+    if "cover_letter" in intents:
+        # 求职信需要简历和职位信息，等这两个任务完成后再执行
+        tasks["CoverLetterGenerator"] = [
+            name for name in ("ResumeAnalyzer", "JobSearcher") if name in tasks
+        ]
+    return tasks if len(tasks) > 1 else {}
+
+
+def get_plan(state: dict) -> Dict[str, List[str]]:
+    """
+    Return the task DAG of the newest user message, planning it once per message.
+    """
+    index = latest_user_message(state.get("messages", []))
+    cached = state.get("plan")
+    if cached and cached.get("index") == index:
+        return cached["tasks"]
+    tasks = plan_tasks(state)
+    state["plan"] = {"index": index, "tasks": tasks}
+    return tasks
+
+
+def ready_tasks(state: dict, tasks: Dict[str, List[str]]) -> List[str]:
+    """
+    Return the planned workers that have not replied to the newest user message yet
+    and whose dependencies all have.
+    """
+    messages = state.get("messages", [])
+    turn_start = latest_user_message(messages) or 0
+    done = {getattr(message, "name", None) for message in messages[turn_start:]}
+    return [
+        name
+        for name, dependencies in tasks.items()
+        if name not in done and all(dependency in done for dependency in dependencies)
+    ]
+
+
+def plan_depth(tasks: Dict[str, List[str]]) -> int:
+    """
+    Return the number of dispatch waves the plan needs (its longest dependency chain).
+    """
+    depths: Dict[str, int] = {}
+
+    def depth(name: str) -> int:
+        if name not in depths:
+            depths[name] = 1 + max((depth(dep) for dep in tasks.get(name, []) if dep in tasks), default=0)
+        return depths[name]
+
+    return max((depth(name) for name in tasks), default=0)
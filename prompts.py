@@ -54,7 +54,7 @@ def get_analyzer_agent_prompt_template():
 
     ⚠️ All responses must be in English only. Do not respond in any other language.
 
-    You have access to one tool: `ResumeExtractorTool`, which reads and extracts text from the file located at `temp/resume.pdf`.
+    You have access to one tool: `ResumeExtractorTool`, which reads and extracts text from the resume file uploaded in this session.
 
     ### Instructions:
     - You **must** call `ResumeExtractorTool` to extract the text.
@@ -0,0 +1,113 @@
+# 简历提取缓存：按 PDF 内容的 SHA-256 缓存提取文本和每页偏移，内存 + 磁盘两级
+import hashlib
+import json
+import os
+import threading
+from collections import OrderedDict
+from dataclasses import asdict, dataclass
+from typing import List, Optional
+
+from pdf_extract import iter_pdf_pages
+
+
+@dataclass
+class ResumeExtraction:
+    sha256: str
+    text: str
+    page_offsets: List[int]  # 每一页在 text 中的起始位置
+
+    def page(self, index: int) -> str:
+        end = self.page_offsets[index + 1] if index + 1 < len(self.page_offsets) else len(self.text)
+        return self.text[self.page_offsets[index]:end]
+
+
+def file_sha256(path: str) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1024 * 1024), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def build_extraction(sha256: str, pages: List[str]) -> ResumeExtraction:
+    page_offsets = []
+    position = 0
+    for page_text in pages:
+        page_offsets.append(position)
+        position += len(page_text)
+    return ResumeExtraction(sha256=sha256, text="".join(pages), page_offsets=page_offsets)
+
+
+class ResumeExtractionCache:
+    """
+    Caches extracted resume text keyed by the SHA-256 of the PDF bytes.
+
+    Lookups go memory -> disk -> PyMuPDF, so a repeated upload or a Streamlit rerun
+    with the same file never parses the PDF again.
+
+    Attributes:
+        cache_dir (str): Directory holding one JSON file per extracted PDF.
+        max_memory_entries (int): Number of extractions kept in memory.
+    """
+
+    def __init__(self, cache_dir: Optional[str] = None, max_memory_entries: int = 32) -> None:
+        self.cache_dir = cache_dir or os.getenv(
+            "RESUME_CACHE_DIR", os.path.join("temp", "resume_cache")
+        )
+        self.max_memory_entries = max_memory_entries
+        self._memory: OrderedDict = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _disk_path(self, sha256: str) -> str:
+        return os.path.join(self.cache_dir, f"{sha256}.json")
+
+    def _remember(self, extraction: ResumeExtraction) -> None:
+        with self._lock:
+            self._memory[extraction.sha256] = extraction
+            self._memory.move_to_end(extraction.sha256)
+            while len(self._memory) > self.max_memory_entries:
+                self._memory.popitem(last=False)
+
+    def get(self, sha256: str) -> Optional[ResumeExtraction]:
+        with self._lock:
+            extraction = self._memory.get(sha256)
+            if extraction is not None:
+                self._memory.move_to_end(sha256)
+                return extraction
+        try:
+            with open(self._disk_path(sha256), encoding="utf-8") as f:
+                extraction = ResumeExtraction(**json.load(f))
+        except (OSError, ValueError, TypeError):
+            return None
+        self._remember(extraction)
+        return extraction
+
+    def put(self, extraction: ResumeExtraction) -> None:
+        self._remember(extraction)
+        os.makedirs(self.cache_dir, exist_ok=True)
+        # 先写临时文件再原子替换，避免并发会话读到半个文件
+        tmp_path = f"{self._disk_path(extraction.sha256)}.{threading.get_ident()}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(asdict(extraction), f, ensure_ascii=False)
+        os.replace(tmp_path, self._disk_path(extraction.sha256))
+
+    def extract(self, path: str) -> ResumeExtraction:
+        """
+        Return the extraction for the PDF at path, parsing it only on a cache miss.
+        """
+        sha256 = file_sha256(path)
+        extraction = self.get(sha256)
+        if extraction is None:
+            extraction = build_extraction(sha256, list(iter_pdf_pages(path)))
+            self.put(extraction)
+        return extraction
+
+
+_cache = ResumeExtractionCache()
+
+
+def get_resume_cache() -> ResumeExtractionCache:
+    """
+    Return the process-wide ResumeExtractionCache.
+    """
+    return _cache
@@ -0,0 +1,308 @@
+# 结构化简历索引：每份简历只构建一次，按段落切分、抽取实体、生成分块向量，各节点只检索需要的部分
+"""
+Structured index over the extracted resume text.
+
+The index splits the resume into sections (experience, education, skills, ...),
+extracts contact details (emails, phones, links) and embeds small chunks
+so nodes can send only the relevant parts of the resume to the LLM.
+
+Embeddings come from a local sentence-transformers model when it is installed
+(RESUME_EMBEDDING_MODEL, default all-MiniLM-L6-v2); otherwise a hashed
+bag-of-words vector is used, which needs no extra dependency.
+"""
+import hashlib
+import math
+import os
+import re
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional
+
+# 段落标题关键词（英文 + 中文）
+SECTION_HEADINGS = {
+    "summary": ["summary", "profile", "about me", "objective", "professional summary", "个人简介", "自我评价", "求职意向"],
+    "experience": ["experience", "work experience", "professional experience", "employment", "work history", "工作经历", "工作经验", "实习经历"],
+    "education": ["education", "academic background", "qualifications", "教育背景", "教育经历"],
+    "skills": ["skills", "technical skills", "core competencies", "technologies", "tools", "专业技能", "技能"],
+    "projects": ["projects", "personal projects", "portfolio", "项目经历", "项目经验"],
+    "certifications": ["certifications", "certificates", "awards", "achievements", "honors", "publications", "证书", "获奖", "荣誉"],
+    "languages": ["languages", "语言能力"],
+}
+HEADER_SECTION = "header"
+
+_HEADING_PATTERNS = {
+    name: re.compile(
+        r"^\W*(?:" + "|".join(re.escape(word) for word in words) + r")\s*[:：]?\s*$",
+        re.IGNORECASE,
+    )
+    for name, words in SECTION_HEADINGS.items()
+}
+_EMAIL = re.compile(r"[\w.+-]+@[\w-]+\.[\w.-]+")
+_PHONE = re.compile(r"\+?\(?\d[\d\s().-]{7,}\d")
+_URL = re.compile(r"(?:https?://|www\.)\S+|(?:linkedin\.com|github\.com)/\S+", re.IGNORECASE)
+_TOKEN = re.compile(r"[a-z0-9+#.]+|[一-鿿]", re.IGNORECASE)
+
+CHUNK_CHARS = 500
+HASH_DIMENSIONS = 512
+
+
+def _tokens(text: str) -> List[str]:
+    return [token.lower().strip(".") for token in _TOKEN.findall(text)]
+
+
+class HashingEmbedder:
+    """
+    Dependency-free embedder: hashed bag of words and word bigrams, L2-normalized.
+    """
+
+    name = "hashing"
+
+    def embed(self, texts: List[str]) -> List[List[float]]:
+        vectors = []
+        for text in texts:
+            vector = [0.0] * HASH_DIMENSIONS
+            tokens = _tokens(text)
+            for gram in tokens + [" ".join(pair) for pair in zip(tokens, tokens[1:])]:
+                digest = hashlib.md5(gram.encode()).digest()
+                vector[int.from_bytes(digest[:4], "little") % HASH_DIMENSIONS] += 1.0
+            norm = math.sqrt(sum(value * value for value in vector)) or 1.0
+            vectors.append([value / norm for value in vector])
+        return vectors
+
+
+class SentenceTransformerEmbedder:
+    """
+    Local sentence-transformers model.
+    """
+
+    def __init__(self, model_name: str) -> None:
+        from sentence_transformers import SentenceTransformer
+
+        self.name = model_name
+        self._model = SentenceTransformer(model_name)
+
+    def embed(self, texts: List[str]) -> List[List[float]]:
+        return self._model.encode(texts, normalize_embeddings=True).tolist()
+
+
+_embedder = None
+_embedder_lock = threading.Lock()
+
+
+def get_embedder():
+    """
+    Return the local embedding model, falling back to HashingEmbedder.
+    """
+    global _embedder
+    if _embedder is None:
+        with _embedder_lock:
+            if _embedder is None:
+                model_name = os.getenv("RESUME_EMBEDDING_MODEL", "sentence-transformers/all-MiniLM-L6-v2")
+                try:
+                    _embedder = SentenceTransformerEmbedder(model_name)
+                except Exception:
+                    _embedder = HashingEmbedder()
+    return _embedder
+
+
+@dataclass
+class ResumeChunk:
+    section: str
+    text: str
+    position: int  # 在原简历中的顺序，用于按原文顺序拼接
+    vector: List[float] = field(default_factory=list, repr=False)
+
+
+@dataclass
+class ResumeIndex:
+    sha256: str
+    sections: Dict[str, str]
+    entities: Dict[str, List[str]]
+    chunks: List[ResumeChunk]
+    total_chars: int
+
+    def render_sections(self, names: List[str], max_chars: int = 4000) -> str:
+        """
+        Render the given sections in resume order, sharing `max_chars` between them.
+        """
+        present = [name for name in self.sections if name in names and self.sections[name]]
+        if not present:
+            return ""
+        budget = max(200, max_chars // len(present))
+        parts = []
+        for name in present:
+            text = self.sections[name]
+            if len(text) > budget:
+                text = text[:budget].rsplit("\n", 1)[0] + "\n..."
+            parts.append(f"[{name.upper()}]\n{text}")
+        return "\n\n".join(parts)
+
+    def render_contact(self, exclude: str = "") -> str:
+        """
+        Render the extracted contact details (emails, phones, links) as one short block,
+        leaving out the values that already occur in `exclude`.
+        """
+        lines = []
+        for key, label in (("emails", "Email"), ("phones", "Phone"), ("links", "Links")):
+            values = [value for value in self.entities.get(key, []) if value not in exclude]
+            if values:
+                lines.append(f"{label}: {', '.join(values)}")
+        return "[CONTACT]\n" + "\n".join(lines) if lines else ""
+
+    def retrieve(
+        self,
+        query: str,
+        k: int = 6,
+        max_chars: int = 3000,
+        always: Optional[List[str]] = None,
+        contact: bool = False,
+    ) -> str:
+        """
+        Return the chunks most similar to `query`, in resume order, within `max_chars`.
+
+        Args:
+            query (str): Text to match, e.g. the user request or a job description.
+            k (int): Maximum number of retrieved chunks.
+            max_chars (int): Character budget of the returned context, including the
+                contact block and the `always` sections.
+            always (List[str]): Sections included first. They may use at most half of
+                the budget; the part that does not fit is truncated, and the remaining
+                chunks of these sections compete with the others by similarity.
+            contact (bool): Start with the extracted contact details that are not already
+                in the selected chunks, so they survive a truncated header.
+        """
+        always = always or []
+        # 按完整的联系方式预留预算，渲染时再去掉已出现在分块中的部分
+        used = min(len(self.render_contact()), max_chars) if contact else 0
+
+        selected = []
+        always_budget = max(0, max_chars // 2 - used)
+        always_used = 0
+        candidates = []
+        for chunk in self.chunks:
+            if chunk.section not in always or always_used >= always_budget:
+                candidates.append(chunk)
+                continue
+            room = always_budget - always_used
+            if len(chunk.text) > room:
+                chunk = ResumeChunk(chunk.section, chunk.text[:room], chunk.position)
+            selected.append(chunk)
+            always_used += len(chunk.text)
+        used += always_used
+
+        query_vector = get_embedder().embed([query])[0] if query else None
+        if query_vector is not None:
+            candidates.sort(
+                key=lambda chunk: -sum(a * b for a, b in zip(query_vector, chunk.vector))
+            )
+        taken = 0
+        for chunk in candidates:
+            if taken >= k:
+                break
+            if used + len(chunk.text) > max_chars:
+                continue
+            selected.append(chunk)
+            used += len(chunk.text)
+            taken += 1
+
+        selected.sort(key=lambda chunk: chunk.position)
+        parts = []
+        if contact:
+            contact_block = self.render_contact(exclude="\n".join(chunk.text for chunk in selected))
+            if contact_block:
+                parts.append(contact_block)
+        last_section = None
+        for chunk in selected:
+            if chunk.section != last_section:
+                parts.append(f"[{chunk.section.upper()}]")
+                last_section = chunk.section
+            parts.append(chunk.text)
+        # 段落标签也计入预算
+        return "\n".join(parts)[:max_chars]
+
+
+def split_sections(text: str) -> Dict[str, str]:
+    """
+    Split resume text into sections keyed by name; text before the first heading is "header".
+    """
+    sections: Dict[str, List[str]] = OrderedDict({HEADER_SECTION: []})
+    current = HEADER_SECTION
+    for line in text.splitlines():
+        stripped = line.strip()
+        heading = None
+        if stripped and len(stripped) <= 40:
+            heading = next(
+                (name for name, pattern in _HEADING_PATTERNS.items() if pattern.match(stripped)),
+                None,
+            )
+        if heading:
+            current = heading
+            sections.setdefault(current, [])
+            continue
+        if stripped:
+            sections[current].append(stripped)
+    return OrderedDict((name, "\n".join(lines)) for name, lines in sections.items() if lines)
+
+
+def extract_entities(text: str) -> Dict[str, List[str]]:
+    """
+    Extract the contact details of the resume: emails, phone numbers and links.
+    """
+    return {
+        "emails": sorted(set(_EMAIL.findall(text))),
+        "phones": sorted({phone.strip() for phone in _PHONE.findall(text)}),
+        "links": sorted(set(_URL.findall(text))),
+    }
+
+
+def _chunk_section(section: str, text: str) -> List[str]:
+    chunks, current = [], ""
+    for line in text.split("\n"):
+        if current and len(current) + len(line) + 1 > CHUNK_CHARS:
+            chunks.append(current)
+            current = ""
+        current = f"{current}\n{line}" if current else line
+    if current:
+        chunks.append(current)
+    return chunks
+
+
+def build_resume_index(resume_text: str) -> ResumeIndex:
+    sections = split_sections(resume_text)
+    chunks = []
+    for section, text in sections.items():
+        for chunk_text in _chunk_section(section, text):
+            chunks.append(ResumeChunk(section=section, text=chunk_text, position=len(chunks)))
+    if chunks:
+        for chunk, vector in zip(chunks, get_embedder().embed([chunk.text for chunk in chunks])):
+            chunk.vector = vector
+    return ResumeIndex(
+        sha256=hashlib.sha256(resume_text.encode()).hexdigest(),
+        sections=sections,
+        entities=extract_entities(resume_text),
+        chunks=chunks,
+        total_chars=len(resume_text),
+    )
+
+
+_indexes: OrderedDict = OrderedDict()
+_indexes_lock = threading.Lock()
+MAX_CACHED_INDEXES = 32
+
+
+def get_resume_index(resume_text: str) -> ResumeIndex:
+    """
+    Return the index of a resume, building it only the first time this text is seen.
+    """
+    key = hashlib.sha256(resume_text.encode()).hexdigest()
+    with _indexes_lock:
+        if key in _indexes:
+            _indexes.move_to_end(key)
+            return _indexes[key]
+    index = build_resume_index(resume_text)
+    with _indexes_lock:
+        _indexes[key] = index
+        while len(_indexes) > MAX_CACHED_INDEXES:
+            _indexes.popitem(last=False)
+    return index
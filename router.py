@@ -0,0 +1,457 @@
+# 混合路由：本地 TF-IDF 线性分类器 -> 单一意图关键词 -> LLM Supervisor，只有本地置信度低时才调用 LLM
+"""
+Hybrid request router for the Supervisor node.
+
+A request is routed by the first tier that is confident:
+
+1. a local TF-IDF nearest-centroid classifier (a linear model), trained on the
+   preset queries shown in the app and a few seed examples;
+2. route keywords of the newest user message (see intent.py), trusted only when
+   they are the only intent found in it;
+3. the same classifier retrained with the LLM's earlier decisions;
+4. the LLM supervisor chain (chains.get_supervisor_chain).
+
+A keyword alone is weak evidence ("impact on job opportunities" is research, not a
+job search), so a confident curated classifier overrules it, and messages with
+several intents are left to the classifiers or the LLM.
+
+LLM decisions are added to the training data of tier 3 (refitted in the background),
+so requests that needed the LLM once are answered locally next time. They are written
+to ROUTER_LOG_PATH only when ROUTER_LOG_TRAFFIC is set.
+"""
+import hashlib
+import json
+import math
+import os
+import re
+import threading
+import time
+from collections import Counter
+from dataclasses import dataclass
+from typing import Awaitable, Callable, Dict, List, Optional, Tuple
+
+from intent import get_intents, latest_user_message
+
+# App 中的预设问题及其路由，app.py 直接使用这里的问题列表
+PRESET_ROUTES = [
+    ("Identify top trends in the tech industry relevant to gen ai", "WebResearcher"),
+    ("Find emerging technologies and their potential impact on job opportunities", "WebResearcher"),
+    ("Summarize my resume", "ResumeAnalyzer"),
+    ("Create a career path visualization based on my skills and interests from my resume", "ResumeAnalyzer"),
+    ("GenAI Jobs at Microsoft", "JobSearcher"),
+    ("Job Search GenAI jobs in India.", "JobSearcher"),
+    ("Analyze my resume and suggest a suitable job role and search for relevant job listings", "ResumeAnalyzer"),
+    ("Generate a cover letter for my resume.", "CoverLetterGenerator"),
+]
+
+SEED_ROUTES = [
+    ("Extract the key skills from my CV", "ResumeAnalyzer"),
+    ("What are the strengths and weaknesses of my resume?", "ResumeAnalyzer"),
+    ("Review my CV and tell me which roles fit my experience", "ResumeAnalyzer"),
+    ("分析我的简历", "ResumeAnalyzer"),
+    ("总结一下我的简历", "ResumeAnalyzer"),
+    ("Write a cover letter for this position", "CoverLetterGenerator"),
+    ("Draft an application letter for the data scientist role", "CoverLetterGenerator"),
+    ("帮我写一封求职信", "CoverLetterGenerator"),
+    ("Find machine learning engineer openings in Berlin", "JobSearcher"),
+    ("Are there any remote data analyst positions?", "JobSearcher"),
+    ("Look for software engineer vacancies at Google", "JobSearcher"),
+    ("Show me internships in London", "JobSearcher"),
+    ("搜索上海的算法工程师职位", "JobSearcher"),
+    ("找一下北京的产品经理工作", "JobSearcher"),
+    ("What is the latest news about OpenAI?", "WebResearcher"),
+    ("Tell me about the company culture at Stripe", "WebResearcher"),
+    ("What is the average salary of a data engineer in Canada?", "WebResearcher"),
+    ("Look up information about LangGraph on the web", "WebResearcher"),
+    ("调研一下大模型行业的发展趋势", "WebResearcher"),
+    ("Format the above answer as a table", "ChatBot"),
+    ("Thanks, that was helpful", "ChatBot"),
+    ("Hi, what can you do?", "ChatBot"),
+    ("Explain the previous result in simpler words", "ChatBot"),
+    ("你好，你能做什么？", "ChatBot"),
+]
+
+ROUTES = ["ResumeAnalyzer", "CoverLetterGenerator", "JobSearcher", "WebResearcher", "ChatBot"]
+
+# 关键词意图 -> 路由，按优先级排列
+KEYWORD_ROUTES = [
+    ("cover_letter", "CoverLetterGenerator"),
+    ("job_search", "JobSearcher"),
+    ("research", "WebResearcher"),
+]
+
+_WORD = re.compile(r"[a-z0-9+#]+|[一-鿿]", re.IGNORECASE)
+_STOPWORDS = {
+    "a", "an", "the", "and", "or", "of", "to", "in", "on", "at", "for", "is", "are", "be",
+    "me", "my", "i", "you", "it", "this", "that", "what", "with", "about", "can", "please",
+    "的", "我", "一", "下",
+}
+
+
+def _features(text: str) -> Counter:
+    # 英文按词、中文按字切分，去掉停用词后再加相邻二元组
+    tokens = [token.lower() for token in _WORD.findall(text)]
+    tokens = [token for token in tokens if token not in _STOPWORDS]
+    return Counter(tokens + [f"{a} {b}" for a, b in zip(tokens, tokens[1:])])
+
+
+def _normalize(vector: Dict[str, float]) -> Dict[str, float]:
+    norm = math.sqrt(sum(value * value for value in vector.values())) or 1.0
+    return {term: value / norm for term, value in vector.items()}
+
+
+class TfidfCentroidClassifier:
+    """
+    TF-IDF nearest-centroid text classifier.
+
+    Each route is represented by the normalized sum of its examples' TF-IDF vectors;
+    a request is scored by cosine similarity with every centroid.
+    """
+
+    def __init__(self) -> None:
+        self.idf: Dict[str, float] = {}
+        self.centroids: Dict[str, Dict[str, float]] = {}
+
+    def fit(self, examples: List[Tuple[str, str]]) -> "TfidfCentroidClassifier":
+        features = [(_features(text), label) for text, label in examples]
+        document_frequency = Counter(term for counts, _ in features for term in counts)
+        total = len(features)
+        self.idf = {
+            term: math.log((1 + total) / (1 + frequency)) + 1.0
+            for term, frequency in document_frequency.items()
+        }
+        sums: Dict[str, Counter] = {}
+        for counts, label in features:
+            sums.setdefault(label, Counter()).update(self._vectorize(counts))
+        self.centroids = {label: _normalize(vector) for label, vector in sums.items()}
+        return self
+
+    def _vectorize(self, counts: Counter) -> Dict[str, float]:
+        vector = {
+            term: (1.0 + math.log(count)) * self.idf[term]
+            for term, count in counts.items()
+            if term in self.idf
+        }
+        return _normalize(vector)
+
+    def scores(self, text: str) -> Dict[str, float]:
+        vector = self._vectorize(_features(text))
+        return {
+            label: sum(weight * centroid.get(term, 0.0) for term, weight in vector.items())
+            for label, centroid in self.centroids.items()
+        }
+
+    def predict(self, text: str) -> Tuple[Optional[str], float, float]:
+        """
+        Return (label, best score, margin over the runner-up).
+        """
+        ranked = sorted(self.scores(text).items(), key=lambda item: -item[1])
+        if not ranked or ranked[0][1] <= 0:
+            return None, 0.0, 0.0
+        runner_up = ranked[1][1] if len(ranked) > 1 else 0.0
+        return ranked[0][0], ranked[0][1], ranked[0][1] - runner_up
+
+
+@dataclass
+class RouteDecision:
+    route: str
+    source: str  # "keywords" / "classifier" / "llm" / "default"
+    confidence: float
+    latency_ms: float
+
+
+_EMAIL = re.compile(r"[\w.+-]+@[\w-]+\.[\w.-]+")
+_PHONE = re.compile(r"\+?\(?\d[\d\s().-]{7,}\d")
+_URL = re.compile(r"(?:https?://|www\.)\S+", re.IGNORECASE)
+MAX_EXAMPLE_CHARS = 300
+
+
+def training_text(text: str) -> str:
+    """
+    Reduce a user message to what the classifier needs: contact details are masked and
+    only the beginning is kept (the routing intent is stated there, pasted resumes are not needed).
+    """
+    text = _EMAIL.sub("<email>", text)
+    text = _URL.sub("<link>", text)
+    text = _PHONE.sub("<phone>", text)
+    return " ".join(text.split())[:MAX_EXAMPLE_CHARS]
+
+
+class HybridRouter:
+    """
+    Routes requests locally when confident and falls back to the LLM supervisor otherwise.
+
+    Only the curated examples (PRESET_ROUTES and SEED_ROUTES) are trusted to overrule a
+    keyword match. LLM decisions from live traffic are unreviewed, so the classifier
+    trained on them is consulted only after the keywords found no single route; it can
+    save an LLM call but never change a decision the curated tiers would make.
+
+    The learned classifier is refitted on a background thread every `refit_every` new
+    examples and swapped in as a whole, so routing never waits for a fit.
+
+    Attributes:
+        log_path (str): JSONL file of LLM routing decisions used as training data.
+        log_traffic (bool): Persist LLM decisions to `log_path` and load them on start
+            (ROUTER_LOG_TRAFFIC, off by default). Messages are stored masked and truncated
+            (see training_text), and the file is compacted to the newest
+            `max_logged_examples` entries.
+        min_score (float): Minimum cosine similarity for a local answer (ROUTER_MIN_SCORE).
+        min_margin (float): Minimum lead over the runner-up route (ROUTER_MIN_MARGIN).
+        refit_every (int): New examples that trigger a background refit (ROUTER_REFIT_EVERY).
+    """
+
+    def __init__(
+        self,
+        log_path: Optional[str] = None,
+        min_score: Optional[float] = None,
+        min_margin: Optional[float] = None,
+        max_logged_examples: int = 2000,
+        log_traffic: Optional[bool] = None,
+        refit_every: Optional[int] = None,
+    ) -> None:
+        self.log_path = log_path or os.getenv("ROUTER_LOG_PATH", os.path.join("temp", "router_log.jsonl"))
+        self.log_traffic = (
+            log_traffic if log_traffic is not None
+            else os.getenv("ROUTER_LOG_TRAFFIC", "0").lower() in ("1", "true", "yes")
+        )
+        self.min_score = min_score if min_score is not None else float(os.getenv("ROUTER_MIN_SCORE", "0.2"))
+        self.min_margin = min_margin if min_margin is not None else float(os.getenv("ROUTER_MIN_MARGIN", "0.1"))
+        self.max_logged_examples = max_logged_examples
+        self.refit_every = max(1, refit_every if refit_every is not None else int(os.getenv("ROUTER_REFIT_EVERY", "50")))
+        self._lock = threading.Lock()
+        self._file_lock = threading.Lock()
+        self._logged = self._load_log() if self.log_traffic else []
+        self._file_entries = len(self._logged)
+        self._curated: Optional[TfidfCentroidClassifier] = None
+        self._learned: Optional[TfidfCentroidClassifier] = None
+        self._pending = len(self._logged)
+        self._refitting = False
+        self._counts = Counter()
+        self._local_ms = 0.0
+        self._local_ms_max = 0.0
+        self._llm_ms = 0.0
+        if self._logged:
+            self._start_refit()
+
+    def _load_log(self) -> List[Tuple[str, str]]:
+        examples = []
+        try:
+            with open(self.log_path, encoding="utf-8") as f:
+                for line in f:
+                    try:
+                        entry = json.loads(line)
+                    except ValueError:
+                        continue
+                    if entry.get("route") in ROUTES and entry.get("text"):
+                        examples.append((training_text(entry["text"]), entry["route"]))
+        except OSError:
+            pass
+        return examples[-self.max_logged_examples:]
+
+    def _get_curated(self) -> TfidfCentroidClassifier:
+        with self._lock:
+            if self._curated is None:
+                self._curated = TfidfCentroidClassifier().fit(PRESET_ROUTES + SEED_ROUTES)
+            return self._curated
+
+    def refit(self) -> None:
+        """
+        Fit the learned classifier on the current examples and swap it in.
+        """
+        with self._lock:
+            examples = list(self._logged)
+            self._pending = 0
+        classifier = TfidfCentroidClassifier().fit(PRESET_ROUTES + SEED_ROUTES + examples) if examples else None
+        with self._lock:
+            self._learned = classifier
+
+    def _start_refit(self) -> None:
+        with self._lock:
+            if self._refitting:
+                return
+            self._refitting = True
+
+        def run():
+            try:
+                self.refit()
+            finally:
+                with self._lock:
+                    self._refitting = False
+                    again = self._pending >= self.refit_every
+                if again:
+                    self._start_refit()
+
+        threading.Thread(target=run, name="router-refit", daemon=True).start()
+
+    def record(self, text: str, route: str) -> None:
+        """
+        Add a labelled request to the training data, and to the traffic log if enabled.
+        """
+        text = training_text(text)
+        if route not in ROUTES or not text:
+            return
+        with self._lock:
+            self._logged = (self._logged + [(text, route)])[-self.max_logged_examples:]
+            self._pending += 1
+            refit = self._pending >= self.refit_every
+        if refit:
+            self._start_refit()
+        if self.log_traffic:
+            self._append_log(text, route)
+
+    def _append_log(self, text: str, route: str) -> None:
+        try:
+            with self._file_lock:
+                directory = os.path.dirname(self.log_path)
+                if directory:
+                    os.makedirs(directory, exist_ok=True)
+                with open(self.log_path, "a", encoding="utf-8") as f:
+                    f.write(json.dumps({"text": text, "route": route}, ensure_ascii=False) + "\n")
+                self._file_entries += 1
+                if self._file_entries > 2 * self.max_logged_examples:
+                    # 文件超过上限的两倍时只保留最新的 max_logged_examples 条
+                    with self._lock:
+                        kept = list(self._logged)
+                    tmp_path = self.log_path + ".tmp"
+                    with open(tmp_path, "w", encoding="utf-8") as f:
+                        for kept_text, kept_route in kept:
+                            f.write(json.dumps({"text": kept_text, "route": kept_route}, ensure_ascii=False) + "\n")
+                    os.replace(tmp_path, self.log_path)
+                    self._file_entries = len(kept)
+        except OSError:
+            pass
+
+    def _confident(self, classifier: TfidfCentroidClassifier, text: str) -> Optional[RouteDecision]:
+        label, score, margin = classifier.predict(text)
+        if label and score >= self.min_score and margin >= self.min_margin:
+            return RouteDecision(label, "classifier", score, 0.0)
+        return None
+
+    def classify(self, text: str, intents: frozenset = frozenset()) -> Optional[RouteDecision]:
+        """
+        Route locally, returning None when neither the classifiers nor the keywords are confident.
+        """
+        start = time.perf_counter()
+        decision = self._confident(self._get_curated(), text)
+        if decision is None and len(intents) == 1:
+            # 只有一个意图且它对应某个路由时才直接采用关键词
+            keyword_routes = [route for intent, route in KEYWORD_ROUTES if intent in intents]
+            if keyword_routes:
+                decision = RouteDecision(keyword_routes[0], "keywords", 1.0, 0.0)
+        if decision is None:
+            with self._lock:
+                learned = self._learned
+            if learned is not None:
+                decision = self._confident(learned, text)
+        elapsed = (time.perf_counter() - start) * 1000
+        with self._lock:
+            self._local_ms += elapsed
+            self._local_ms_max = max(self._local_ms_max, elapsed)
+        if decision:
+            decision.latency_ms = elapsed
+        return decision
+
+    def route(self, text: str, fallback: Callable[[], str], intents: frozenset = frozenset()) -> RouteDecision:
+        """
+        Route a request, calling `fallback` (the LLM supervisor) only when the local tiers are unsure.
+        """
+        decision = self.classify(text, intents)
+        if decision is None:
+            start = time.perf_counter()
+            try:
+                decision = self._fallback_decision(text, fallback(), start)
+            except Exception:
+                decision = self._fallback_decision(text, None, start)
+        return self._count(decision)
+
+    async def aroute(
+        self,
+        text: str,
+        fallback: Callable[[], Awaitable[str]],
+        intents: frozenset = frozenset(),
+    ) -> RouteDecision:
+        """
+        Async variant of `route`; `fallback` returns an awaitable (e.g. the chain's ainvoke).
+        """
+        decision = self.classify(text, intents)
+        if decision is None:
+            start = time.perf_counter()
+            try:
+                decision = self._fallback_decision(text, await fallback(), start)
+            except Exception:
+                decision = self._fallback_decision(text, None, start)
+        return self._count(decision)
+
+    def _fallback_decision(self, text: str, route: Optional[str], start: float) -> RouteDecision:
+        # LLM 调用失败时默认交给 ChatBot，不写入训练数据
+        if route is None:
+            decision = RouteDecision("ChatBot", "default", 0.0, 0.0)
+        else:
+            decision = RouteDecision(route, "llm", 1.0, 0.0)
+            self.record(text, route)
+        decision.latency_ms = (time.perf_counter() - start) * 1000
+        with self._lock:
+            self._llm_ms += decision.latency_ms
+        return decision
+
+    def _count(self, decision: RouteDecision) -> RouteDecision:
+        with self._lock:
+            self._counts[decision.source] += 1
+        return decision
+
+    def stats(self) -> dict:
+        """
+        Return how many requests each tier answered, the local hit rate and latencies.
+        """
+        with self._lock:
+            total = sum(self._counts.values())
+            local = self._counts["keywords"] + self._counts["classifier"]
+            fallbacks = self._counts["llm"] + self._counts["default"]
+            return {
+                "requests": total,
+                **{source: self._counts[source] for source in ("keywords", "classifier", "llm", "default")},
+                "hit_rate": local / total if total else 0.0,
+                "local_ms_avg": self._local_ms / total if total else 0.0,
+                "local_ms_max": self._local_ms_max,
+                "llm_ms_avg": self._llm_ms / fallbacks if fallbacks else 0.0,
+                "training_examples": len(PRESET_ROUTES) + len(SEED_ROUTES) + len(self._logged),
+                "learned_examples": len(self._logged),
+            }
+
+
+_router: Optional[HybridRouter] = None
+_router_lock = threading.Lock()
+
+
+def get_router() -> HybridRouter:
+    """
+    Return the process-wide HybridRouter.
+    """
+    global _router
+    if _router is None:
+        with _router_lock:
+            if _router is None:
+                _router = HybridRouter()
+    return _router
+
+
+async def aroute_request(state: dict, fallback: Callable[[], Awaitable[str]]) -> RouteDecision:
+    """
+    Route the newest user message once and cache the decision in state["route"].
+
+    Like the intent cache, the decision is keyed by the message index and a hash of
+    its content, so the Supervisor's later passes in the same turn never call the
+    classifier or the LLM again.
+    """
+    messages = state.get("messages", [])
+    index = latest_user_message(messages)
+    text = str(messages[index].content) if index is not None else state.get("user_input", "")
+    digest = hashlib.sha1(text.encode()).hexdigest()
+
+    cached = state.get("route")
+    if cached and cached.get("index") == index and cached.get("digest") == digest:
+        return cached["decision"]
+
+    decision = await get_router().aroute(text, fallback, get_intents(state))
+    state["route"] = {"index": index, "digest": digest, "decision": decision}
+    return decision
@@ -0,0 +1,55 @@
+# Streamlit 脚本上下文传递：回调在工作线程/后台事件循环线程中执行时，只在会操作 Streamlit 的方法里挂载一次上下文
+import threading
+
+from streamlit.runtime.scriptrunner import add_script_run_ctx, get_script_run_ctx
+
+# StreamlitCallbackHandler 中会写入 Streamlit 元素的回调；其余回调（如 on_chain_start）不拦截
+STREAMLIT_CALLBACKS = (
+    "on_llm_start",
+    "on_llm_new_token",
+    "on_llm_end",
+    "on_llm_error",
+    "on_tool_start",
+    "on_tool_end",
+    "on_tool_error",
+    "on_agent_action",
+    "on_agent_finish",
+)
+
+
+class ScriptRunContextMixin:
+    """
+    Propagates the Streamlit script-run context to the threads callbacks run on.
+
+    The context of the creating (script) thread is captured once. Methods that touch
+    Streamlit call `attach_script_ctx`, which attaches the context only when the
+    current thread does not already carry it - once per worker thread, or again
+    after a shared thread (e.g. the background event loop) served another session.
+    Callbacks that never touch Streamlit are not intercepted at all.
+
+    Put it before the Streamlit handler in the bases:
+        class Handler(ScriptRunContextMixin, StreamlitCallbackHandler): ...
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._script_ctx = get_script_run_ctx(suppress_warning=True)
+
+    def attach_script_ctx(self) -> None:
+        ctx = self._script_ctx
+        if ctx is not None and get_script_run_ctx(suppress_warning=True) is not ctx:
+            add_script_run_ctx(threading.current_thread(), ctx)
+
+
+def _attaching(name: str):
+    def method(self, *args, **kwargs):
+        self.attach_script_ctx()
+        return getattr(super(ScriptRunContextMixin, self), name)(*args, **kwargs)
+
+    method.__name__ = name
+    method.__qualname__ = f"ScriptRunContextMixin.{name}"
+    return method
+
+
+for _name in STREAMLIT_CALLBACKS:
+    setattr(ScriptRunContextMixin, _name, _attaching(_name))
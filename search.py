@@ -3,10 +3,15 @@ import os
 import urllib
 import asyncio
 import requests
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from typing import List, Literal, Union, Optional
-from asgiref.sync import sync_to_async
-from linkedin_api import Linkedin
-from bs4 import BeautifulSoup
+from extractors import extract_job, extract_job_ids
+from fetch_engine import AsyncFetcher
+from job_cache import get_job_cache
+from search_cache import get_search_cache, normalize_search_query
+from linkedin_client import get_linkedin_client_manager
+from parse_pool import run_parser
 
 employment_type_mapping = {
     "full-time": "F",
@@ -33,6 +38,13 @@ job_type_mapping = {
     "hybrid": "3",
 }
 
+# LinkedIn guest search 每页返回的职位卡片数
+GUEST_SEARCH_PAGE_SIZE = 10
+
+# 分页请求共享一个 requests.Session，复用 keep-alive 连接
+_guest_search_session = None
+_guest_search_session_lock = threading.Lock()
+
 
 def build_linkedin_job_url(
     keywords,
@@ -40,13 +52,14 @@ def build_linkedin_job_url(
     employment_type=None,
     experience_level=None,
     job_type=None,
-    start=10,
+    start=0,
 ):
     base_url = "https://www.linkedin.com/jobs-guest/jobs/api/seeMoreJobPostings/search/"
 
     # Prepare query parameters
     query_params = {
         "keywords": keywords,
+        "start": start,
     }
 
     if location:
@@ -109,8 +122,8 @@ def get_job_ids_from_linkedin_api(
         experience_level = validate_job_search_params(
             experience, experience_type_mapping
         )
-        api = Linkedin(os.getenv("LINKEDIN_EMAIL"), os.getenv("LINKEDIN_PASS"))
-        job_postings = api.search_jobs(
+        job_postings = get_linkedin_client_manager().call(
+            "search_jobs",
             keywords=keywords,
             job_type=employment_type,
             location_name=location_name,
@@ -162,135 +175,137 @@ def get_job_ids(
     listed_at: Optional[Union[int, str]] = 86400,
     distance=None,
 ):
-    if os.environ.get("LINKEDIN_SEARCH") == "linkedin_api":
-        return get_job_ids_from_linkedin_api(
+    mode = "linkedin_api" if os.environ.get("LINKEDIN_SEARCH") == "linkedin_api" else "guest"
+    # 规范化大小写、空白和过滤条件顺序，近似重复的查询命中同一条缓存
+    cache_key = normalize_search_query(
+        keywords,
+        location_name=location_name,
+        employment_type=employment_type,
+        limit=limit,
+        job_type=job_type,
+        experience=experience,
+        listed_at=listed_at,
+        distance=distance,
+        mode=mode,
+    )
+
+    def search():
+        # validate_job_search_params 会原地修改列表，每次搜索都传入副本
+        copy = lambda value: list(value) if isinstance(value, list) else value
+        if mode == "linkedin_api":
+            return get_job_ids_from_linkedin_api(
+                keywords=keywords,
+                location_name=location_name,
+                employment_type=copy(employment_type),
+                limit=limit,
+                job_type=copy(job_type),
+                experience=copy(experience),
+                listed_at=listed_at,
+                distance=distance,
+            )
+        return get_job_ids_from_guest_search(
             keywords=keywords,
             location_name=location_name,
-            employment_type=employment_type,
+            employment_type=copy(employment_type),
+            job_type=copy(job_type),
+            experience=copy(experience),
             limit=limit,
-            job_type=job_type,
-            experience=experience,
-            listed_at=listed_at,
-            distance=distance,
         )
 
-    try:
-        # Construct the URL for LinkedIn job search
+    return get_search_cache().get_or_fetch(cache_key, search)
+
+
+def get_job_ids_from_guest_search(
+    keywords: str,
+    location_name: str,
+    employment_type=None,
+    job_type=None,
+    experience=None,
+    limit: Optional[int] = 10,
+    page_concurrency: Optional[int] = None,
+    max_pages: Optional[int] = None,
+):
+    """
+    Page through the LinkedIn guest search until `limit` unique job IDs are found.
+    Each wave fetches, concurrently, the pages still needed to reach `limit` (at most
+    `page_concurrency`), so duplicate or skipped cards are made up by further pages.
+    Paging stops at the first empty page or after `max_pages` pages
+    (JOB_SEARCH_MAX_PAGES, default 20, never fewer than `limit` needs).
+    """
+    limit = limit or 10
+    page_concurrency = page_concurrency or int(os.getenv("JOB_SEARCH_PAGE_CONCURRENCY", "3"))
+    max_pages = max(
+        max_pages or int(os.getenv("JOB_SEARCH_MAX_PAGES", "20")),
+        -(-limit // GUEST_SEARCH_PAGE_SIZE),
+    )
+
+    def fetch_page(page):
         job_url = build_linkedin_job_url(
             keywords=keywords,
             location=location_name,
             employment_type=employment_type,
             experience_level=experience,
             job_type=job_type,
+            start=page * GUEST_SEARCH_PAGE_SIZE,
         )
+        return parse_job_ids_page(get_guest_search_session().get(job_url, timeout=30).text)
 
-        # Send a GET request to the URL and store the response
-        response = requests.get(
-            job_url, timeout=30, headers={"User-Agent": "Mozilla/5.0"}
-        )
-
-        # Get the HTML, parse the response and find all list items(jobs postings)
-        list_data = response.text
-        list_soup = BeautifulSoup(list_data, "html.parser")
-        page_jobs = list_soup.find_all("li")
-
-        # Create an empty list to store the job postings
-        job_ids = []
-        # Itetrate through job postings to find job ids
-        for job in page_jobs:
-            base_card_div = job.find("div", {"class": "base-card"})
-            job_id = base_card_div.get("data-entity-urn").split(":")[3]
-            job_ids.append(job_id)
-        return job_ids
+    job_ids = []
+    seen = set()
+    try:
+        with ThreadPoolExecutor(max_workers=page_concurrency) as executor:
+            next_page = 0
+            while next_page < max_pages and len(job_ids) < limit:
+                pages_needed = -(-(limit - len(job_ids)) // GUEST_SEARCH_PAGE_SIZE)
+                pages = range(next_page, min(next_page + min(pages_needed, page_concurrency), max_pages))
+                next_page = pages.stop
+                reached_end = False
+                # map 按页码顺序返回结果，保证 job_ids 顺序稳定
+                for page_ids in executor.map(fetch_page, pages):
+                    if not page_ids:
+                        reached_end = True
+                        break
+                    for job_id in page_ids:
+                        if job_id not in seen:
+                            seen.add(job_id)
+                            job_ids.append(job_id)
+                if reached_end:
+                    break
     except Exception as e:
         print(f"Error in fetching job ids from LinkedIn -> {e}")
-    return []
-
-
-async def fetch_job_details(session, job_id):
-    # Construct the URL for each job using the job ID
-    job_url = f"https://www.linkedin.com/jobs-guest/jobs/api/jobPosting/{job_id}"
-
-    # Send a GET request to the job URL
-    async with session.get(job_url) as response:
-        job_soup = BeautifulSoup(await response.text(), "html.parser")
-
-        # Create a dictionary to store job details
-        job_post = {}
-
-        # Try to extract and store the job title
-        try:
-            job_post["job_title"] = job_soup.find(
-                "h2",
-                {
-                    "class": "top-card-layout__title font-sans text-lg papabear:text-xl font-bold leading-open text-color-text mb-0 topcard__title"
-                },
-            ).text.strip()
-        except Exception as exc:
-            job_post["job_title"] = ""
+    return job_ids[:limit]
 
-        try:
-            job_post["job_location"] = job_soup.find(
-                "span",
-                {"class": "topcard__flavor topcard__flavor--bullet"},
-            ).text.strip()
-        except Exception as exc:
-            job_post["job_location"] = ""
 
-        # Try to extract and store the company name
-        try:
-            job_post["company_name"] = job_soup.find(
-                "a", {"class": "topcard__org-name-link topcard__flavor--black-link"}
-            ).text.strip()
-        except Exception as exc:
-            job_post["company_name"] = ""
+def get_guest_search_session():
+    global _guest_search_session
+    if _guest_search_session is None:
+        with _guest_search_session_lock:
+            if _guest_search_session is None:
+                session = requests.Session()
+                session.headers["User-Agent"] = "Mozilla/5.0"
+                _guest_search_session = session
+    return _guest_search_session
 
-        # Try to extract and store the time posted
-        try:
-            job_post["time_posted"] = job_soup.find(
-                "span", {"class": "posted-time-ago__text topcard__flavor--metadata"}
-            ).text.strip()
-        except Exception as exc:
-            job_post["time_posted"] = ""
 
-        # Try to extract and store the number of applicants
-        try:
-            job_post["num_applicants"] = job_soup.find(
-                "span",
-                {
-                    "class": "num-applicants__caption topcard__flavor--metadata topcard__flavor--bullet"
-                },
-            ).text.strip()
-        except Exception as exc:
-            job_post["num_applicants"] = ""
+def parse_job_ids_page(html):
+    return extract_job_ids(html)
 
-        # Try to extract and store the job description
-        try:
-            job_description = job_soup.find(
-                "div", {"class": "decorated-job-posting__details"}
-            ).text.strip()
-            job_post["job_desc_text"] = job_description
-        except Exception as exc:
-            job_post["job_desc_text"] = ""
 
-        try:
-            # Try to extract and store the apply link
-            apply_link_tag = job_soup.find("a", class_="topcard__link")
-            if apply_link_tag:
-                apply_link = apply_link_tag.get("href")
-                job_post["apply_link"] = apply_link
-        except Exception as exc:
-            job_post["apply_link"] = ""
+async def fetch_job_details(session, job_id, fetcher: Optional[AsyncFetcher] = None):
+    # Construct the URL for each job using the job ID
+    job_url = f"https://www.linkedin.com/jobs-guest/jobs/api/jobPosting/{job_id}"
 
-        return job_post
+    # Send a GET request to the job URL (bounded, rate limited and retried by the fetcher)
+    fetcher = fetcher or AsyncFetcher(session)
+    html = await fetcher.fetch_text(job_url)
+    # 解析交给解析池执行，事件循环继续处理其他请求
+    return await run_parser(extract_job, html)
 
 
 async def get_job_details_from_linkedin_api(job_id):
     try:
-        api = Linkedin(os.getenv("LINKEDIN_EMAIL"), os.getenv("LINKEDIN_PASS"))
-        job_data = await sync_to_async(api.get_job)(
-            job_id
-        )  # Assuming this function is async and fetches job data
+        # 复用同一个已登录客户端，在有界线程池中执行阻塞调用
+        job_data = await get_linkedin_client_manager().acall("get_job", job_id)
 
         # Construct the job data dictionary with defaults
         job_data_dict = {
@@ -331,25 +346,87 @@ async def get_job_details_from_linkedin_api(job_id):
     return job_data_dict
 
 
-async def fetch_all_jobs(job_ids, batch_size=5):
-    results = []
+async def stream_job_details(job_ids, batch_size=5, session=None):
+    """
+    Fetch job details with at most `batch_size` requests in flight and yield
+    (job_id, job_post) pairs as soon as each job completes.
+    Jobs that still fail after the fetcher's retries are logged and skipped.
+    """
+    if os.environ.get("LINKEDIN_SEARCH") == "linkedin_api":
+        # 并发由 LinkedInClientManager 的有界线程池控制
+        async def fetch_from_api(job_id):
+            return job_id, await get_job_details_from_linkedin_api(job_id)
+
+        for next_done in asyncio.as_completed([fetch_from_api(job_id) for job_id in job_ids]):
+            yield await next_done
+        return
 
+    owns_session = session is None
+    if owns_session:
+        session = aiohttp.ClientSession()
     try:
-        if os.environ.get("LINKEDIN_SEARCH") == "linkedin_api":
-            return await asyncio.gather(
-                *[get_job_details_from_linkedin_api(job_id) for job_id in job_ids]
-            )
+        fetcher = AsyncFetcher(session, concurrency=batch_size)
+
+        async def fetch_one(job_id):
+            try:
+                return job_id, await fetch_job_details(session, job_id, fetcher)
+            except Exception as exc:
+                print(f"Error in fetching job details for {job_id} -> {exc}")
+                return job_id, None
 
-        async with aiohttp.ClientSession() as session:
-            tasks = []
-            for job_id in job_ids:
-                task = asyncio.create_task(fetch_job_details(session, job_id))
-                tasks.append(task)
+        tasks = [asyncio.create_task(fetch_one(job_id)) for job_id in job_ids]
+        try:
+            for next_done in asyncio.as_completed(tasks):
+                job_id, job_post = await next_done
+                if job_post is not None:
+                    yield job_id, job_post
+        finally:
+            for task in tasks:
+                task.cancel()
+    finally:
+        if owns_session:
+            await session.close()
+
+
+async def fetch_all_jobs(job_ids, batch_size=5, session=None):
+    results = {}
+    job_ids = [str(job_id) for job_id in job_ids]
+    source = "linkedin_api" if os.environ.get("LINKEDIN_SEARCH") == "linkedin_api" else "guest"
+
+    # 只对缓存中缺失或已过期的 job_id 发起网络请求；SQLite 读写放到线程里，不阻塞共享事件循环
+    try:
+        cache = get_job_cache()
+        results.update(await asyncio.to_thread(cache.get_many, job_ids, source=source))
+    except Exception as exc:
+        # 缓存不可用按未命中处理
+        cache = None
+        print(f"Job cache unavailable -> {exc}")
 
-            # Await the completion of all tasks
-            results = await asyncio.gather(*tasks)
-            return results
+    fetched = {}
+    try:
+        missing = [job_id for job_id in job_ids if job_id not in results]
+        async for job_id, job_post in stream_job_details(
+            missing, batch_size=batch_size, session=session
+        ):
+            fetched[job_id] = job_post
     except Exception as exc:
         print(f"Error in fetching job details -> {exc}")
+    results.update(fetched)
+
+    if cache is not None:
+        # 标题和描述都为空说明解析失败，不写入缓存
+        try:
+            await asyncio.to_thread(
+                cache.put_many,
+                {
+                    job_id: job_post
+                    for job_id, job_post in fetched.items()
+                    if job_post.get("job_title") or job_post.get("job_desc_text")
+                },
+                source=source,
+            )
+        except Exception as exc:
+            print(f"Failed to write job cache -> {exc}")
 
-    return results
+    # 保持与输入 job_ids 相同的顺序
+    return [results[job_id] for job_id in job_ids if job_id in results]
@@ -0,0 +1,139 @@
+# 职位搜索结果缓存：按规范化后的查询参数缓存 job_id 列表，支持短 TTL 和 stale-while-revalidate
+import os
+import threading
+import time
+from typing import Callable, Dict, List, Optional, Tuple
+
+
+def _normalize_text(value) -> str:
+    if value is None:
+        return ""
+    return " ".join(str(value).lower().split())
+
+
+def _normalize_filter(value) -> tuple:
+    if not value:
+        return ()
+    if isinstance(value, str):
+        value = [value]
+    return tuple(sorted({_normalize_text(item) for item in value if item}))
+
+
+def normalize_search_query(
+    keywords,
+    location_name=None,
+    employment_type=None,
+    limit=None,
+    job_type=None,
+    experience=None,
+    listed_at=None,
+    distance=None,
+    mode="guest",
+) -> tuple:
+    """
+    Build a canonical cache key for a job search.
+
+    Case and whitespace are normalized, and multi-value filters are de-duplicated and
+    sorted, so "GenAI  Engineer" with ["remote", "hybrid"] and "genai engineer" with
+    ["hybrid", "remote"] map to the same key.
+    """
+    return (
+        mode,
+        _normalize_text(keywords),
+        _normalize_text(location_name),
+        _normalize_filter(employment_type),
+        _normalize_filter(job_type),
+        _normalize_filter(experience),
+        str(limit),
+        str(listed_at),
+        str(distance),
+    )
+
+
+class SearchResultCache:
+    """
+    In-memory TTL cache of job search results.
+
+    Entries younger than `ttl` are returned directly. Entries younger than
+    `ttl + stale_ttl` are returned immediately while a background refresh runs
+    (stale-while-revalidate); set `stale_ttl` to 0 to disable it.
+
+    Attributes:
+        ttl (float): Seconds a result stays fresh.
+        stale_ttl (float): Extra seconds a stale result may still be served.
+        max_entries (int): Maximum number of cached queries.
+        hits (int): Lookups served from the cache (fresh or stale).
+        misses (int): Lookups that ran the search.
+    """
+
+    def __init__(
+        self,
+        ttl: Optional[float] = None,
+        stale_ttl: Optional[float] = None,
+        max_entries: int = 256,
+    ) -> None:
+        self.ttl = ttl if ttl is not None else float(os.getenv("SEARCH_CACHE_TTL", "300"))
+        self.stale_ttl = (
+            stale_ttl if stale_ttl is not None else float(os.getenv("SEARCH_CACHE_STALE_TTL", "0"))
+        )
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._entries: Dict[tuple, Tuple[float, List[str]]] = {}
+        self._refreshing = set()
+        self._lock = threading.Lock()
+
+    def _store(self, key: tuple, value: List[str]) -> None:
+        # 空结果通常表示请求失败，不缓存
+        if not value:
+            return
+        with self._lock:
+            self._entries[key] = (time.monotonic(), list(value))
+            if len(self._entries) > self.max_entries:
+                oldest = min(self._entries, key=lambda k: self._entries[k][0])
+                del self._entries[oldest]
+
+    def _refresh(self, key: tuple, fetch: Callable[[], List[str]]) -> None:
+        try:
+            self._store(key, fetch())
+        except Exception as exc:
+            print(f"Error in refreshing cached job search -> {exc}")
+        finally:
+            with self._lock:
+                self._refreshing.discard(key)
+
+    def get_or_fetch(self, key: tuple, fetch: Callable[[], List[str]]) -> List[str]:
+        """
+        Return the cached result for key, running fetch on a miss.
+        """
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                age = now - entry[0]
+                if age <= self.ttl:
+                    self.hits += 1
+                    return list(entry[1])
+                if age <= self.ttl + self.stale_ttl:
+                    self.hits += 1
+                    if key not in self._refreshing:
+                        self._refreshing.add(key)
+                        threading.Thread(
+                            target=self._refresh, args=(key, fetch), daemon=True
+                        ).start()
+                    return list(entry[1])
+            self.misses += 1
+
+        value = fetch()
+        self._store(key, value)
+        return value
+
+
+_search_cache = SearchResultCache()
+
+
+def get_search_cache() -> SearchResultCache:
+    """
+    Return the process-wide SearchResultCache.
+    """
+    return _search_cache
@@ -0,0 +1,126 @@
+# 逐 token 渲染 Agent 输出：graph.astream(stream_mode="messages") 产生的 token 写入同一个占位符，并统计首 token 延迟（TTFT）
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, List, Optional
+
+from langchain_core.messages import AIMessageChunk
+
+# Supervisor 只输出路由决策（结构化输出），不展示给用户
+HIDDEN_NODES = {"Supervisor"}
+
+
+def chunk_text(chunk: AIMessageChunk) -> str:
+    content = chunk.content
+    if isinstance(content, str):
+        return content
+    # 部分模型以内容块列表的形式返回
+    return "".join(
+        part.get("text", "") for part in content if isinstance(part, dict) and part.get("type") == "text"
+    )
+
+
+class StreamMetrics:
+    """
+    Process-wide time-to-first-token and total streaming time of answered requests.
+    """
+
+    def __init__(self, max_samples: int = 500) -> None:
+        self.max_samples = max_samples
+        self._ttft_ms: List[float] = []
+        self._total_ms: List[float] = []
+        self._lock = threading.Lock()
+
+    def record(self, ttft_ms: Optional[float], total_ms: float) -> None:
+        with self._lock:
+            if ttft_ms is not None:
+                self._ttft_ms = (self._ttft_ms + [ttft_ms])[-self.max_samples:]
+            self._total_ms = (self._total_ms + [total_ms])[-self.max_samples:]
+
+    @staticmethod
+    def _percentile(values: List[float], share: float) -> float:
+        if not values:
+            return 0.0
+        ordered = sorted(values)
+        return ordered[min(len(ordered) - 1, int(share * len(ordered)))]
+
+    def summary(self) -> dict:
+        """
+        Return p50/p95 time-to-first-token and total time in milliseconds.
+        """
+        with self._lock:
+            return {
+                "requests": len(self._total_ms),
+                "ttft_p50_ms": self._percentile(self._ttft_ms, 0.5),
+                "ttft_p95_ms": self._percentile(self._ttft_ms, 0.95),
+                "total_p50_ms": self._percentile(self._total_ms, 0.5),
+                "total_p95_ms": self._percentile(self._total_ms, 0.95),
+            }
+
+
+_metrics = StreamMetrics()
+
+
+def get_stream_metrics() -> StreamMetrics:
+    """
+    Return the process-wide StreamMetrics.
+    """
+    return _metrics
+
+
+class TokenStreamRenderer:
+    """
+    Renders LLM tokens from graph.astream(stream_mode="messages") into one Streamlit placeholder.
+
+    Tokens are grouped per graph node, so parallel branches each get their own
+    section instead of interleaving. The first visible token sets the time-to-first-token.
+
+    Attributes:
+        placeholder: Streamlit element created with st.empty().
+        min_interval (float): Minimum seconds between two re-renders of the placeholder.
+    """
+
+    def __init__(self, placeholder: Any, min_interval: float = 0.05) -> None:
+        self.placeholder = placeholder
+        self.min_interval = min_interval
+        self.started = time.perf_counter()
+        self.ttft_ms: Optional[float] = None
+        self.tokens = 0
+        self._sections: OrderedDict = OrderedDict()
+        self._last_render = 0.0
+
+    def on_message(self, chunk: Any, metadata: dict) -> None:
+        """
+        Handle one (message, metadata) item of the "messages" stream.
+        """
+        node = metadata.get("langgraph_node", "")
+        if not isinstance(chunk, AIMessageChunk) or node in HIDDEN_NODES:
+            return
+        text = chunk_text(chunk)
+        if not text:
+            return
+        if self.ttft_ms is None:
+            self.ttft_ms = (time.perf_counter() - self.started) * 1000
+        self.tokens += 1
+        self._sections[node] = self._sections.get(node, "") + text
+        now = time.perf_counter()
+        # 限制重绘频率，避免每个 token 都触发一次前端更新
+        if now - self._last_render >= self.min_interval:
+            self._render()
+            self._last_render = now
+
+    def _render(self) -> None:
+        if len(self._sections) == 1:
+            body = next(iter(self._sections.values()))
+        else:
+            body = "\n\n".join(f"**{node}**\n\n{text}" for node, text in self._sections.items())
+        self.placeholder.markdown(body + " ▌")
+
+    def finish(self) -> dict:
+        """
+        Clear the placeholder, record the metrics and return this request's timings.
+        """
+        total_ms = (time.perf_counter() - self.started) * 1000
+        self.placeholder.empty()
+        get_stream_metrics().record(self.ttft_ms, total_ms)
+        return {"ttft_ms": self.ttft_ms, "total_ms": total_ms, "tokens": self.tokens}
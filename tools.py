@@ -1,16 +1,28 @@
 # define tools
-import os
 import asyncio
+import os
+from contextvars import ContextVar
 from dotenv import load_dotenv
 from pydantic import Field
 from langchain.tools import BaseTool, tool, StructuredTool
 from data_loader import load_resume, write_cover_letter_to_doc
+from resume_cache import get_resume_cache
 from schemas import JobSearchInput
+from async_runtime import get_shared_session, run_coroutine, run_on_runtime
 from search import get_job_ids, fetch_all_jobs
 from utils import FireCrawlClient, SerperClient
 
 load_dotenv()
 
+# 当前会话的简历文件路径，由 ResumeAnalyzer 节点根据 AgentState["resume_path"] 设置。
+# 执行器在会话间共享，因此路径不能保存在工具实例上。
+current_resume_path: ContextVar = ContextVar("current_resume_path", default=None)
+
+
+async def fetch_jobs_with_shared_session(job_ids):
+    # 在后台事件循环上执行，复用长连接 aiohttp 会话
+    return await fetch_all_jobs(job_ids, session=await get_shared_session())
+
 
 # 根据用户指定条件在 LinkedIn 搜索职位
 def linkedin_job_search(
@@ -36,9 +48,37 @@ def linkedin_job_search(
         experience=experience,
         distance=distance,
     )
-    job_desc = asyncio.run(fetch_all_jobs(job_ids))
+    job_desc = run_coroutine(fetch_jobs_with_shared_session(job_ids))
     return job_desc
 
+
+async def alinkedin_job_search(
+    keywords: str,
+    location_name: str = None,
+    job_type: str = None,
+    limit: int = 5,
+    employment_type: str = None,
+    listed_at=None,
+    experience=None,
+    distance=None,
+) -> dict:  # type: ignore
+    """
+    Search LinkedIn for job postings based on specified criteria. Returns detailed job listings.
+    """
+    # ID 搜索走 requests 线程池和缓存，放到线程里执行，避免阻塞事件循环
+    job_ids = await asyncio.to_thread(
+        get_job_ids,
+        keywords=keywords,
+        location_name=location_name,
+        employment_type=employment_type,
+        limit=limit,
+        job_type=job_type,
+        listed_at=listed_at,
+        experience=experience,
+        distance=distance,
+    )
+    return await run_on_runtime(fetch_jobs_with_shared_session(job_ids))
+
 # 将 LinkedIn 搜索封装为 StructuredTool
 def get_job_search_tool():
     """
@@ -48,6 +88,7 @@ def get_job_search_tool():
     """
     job_pipeline_tool = StructuredTool.from_function(
         func=linkedin_job_search,
+        coroutine=alinkedin_job_search,
         name="JobSearchTool",
         description="Search LinkedIn for job postings based on specified criteria. Returns detailed job listings",
         args_schema=JobSearchInput,
@@ -67,18 +108,14 @@ class ResumeExtractorTool(BaseTool):
     def extract_resume(self) -> str:
         """
         Extract resume content from a PDF file.
+        The text is cached by the SHA-256 of the PDF bytes, so an unchanged file is parsed only once.
         """
-        import fitz  # PyMuPDF
+        resume_path = current_resume_path.get() or os.path.join("temp", "resume.pdf")
 
-        temp_path = os.path.join("temp", "resume.pdf")
+        if not os.path.exists(resume_path):
+            return "❌ No resume file found for this session. Please upload again."
 
-        if not os.path.exists(temp_path):
-            return "❌ No resume file found in temp directory. Please upload again."
-
-        text = ""
-        with fitz.open(temp_path) as pdf:
-            for page in pdf:
-                text += page.get_text("text")
+        text = get_resume_cache().extract(resume_path).text
 
         if not text.strip():
             return "⚠️ Resume PDF is empty or unreadable."
@@ -114,15 +151,7 @@ def save_cover_letter_for_specific_job(
     return f"Here is the download link: {abs_path}"
 
 
-# Web 搜索工具
-@tool("google_search")
-def get_google_search_results(
-    query: str = Field(..., description="Search query for web")
-) -> str:
-    """
-    search the web for the given query and return the search results.
-    """
-    response = SerperClient().search(query)
+def format_search_results(response: dict) -> str:
     items = response.get("items")
     string = []
     for result in items:
@@ -143,9 +172,33 @@ def get_google_search_results(
     content = "\n".join(string)
     return content
 
+
+# Web 搜索工具，同时提供同步和异步实现
+def google_search(
+    query: str = Field(..., description="Search query for web")
+) -> str:
+    """
+    search the web for the given query and return the search results.
+    """
+    return format_search_results(SerperClient().search(query))
+
+
+async def agoogle_search(
+    query: str = Field(..., description="Search query for web")
+) -> str:
+    """
+    search the web for the given query and return the search results.
+    """
+    return format_search_results(await SerperClient().search_async(query))
+
+
+get_google_search_results = StructuredTool.from_function(
+    func=google_search, coroutine=agoogle_search, name="google_search"
+)
+
+
 # 网站爬取工具
-@tool("scrape_website")
-def scrape_website(url: str = Field(..., description="Url to be scraped")) -> str:
+def scrape(url: str = Field(..., description="Url to be scraped")) -> str:
     """
     Scrape the content of a website and return the text.
     """
@@ -154,3 +207,19 @@ def scrape_website(url: str = Field(..., description="Url to be scraped")) -> st
     except Exception as exc:
         return f"Failed to scrape {url}"
     return content
+
+
+async def ascrape(url: str = Field(..., description="Url to be scraped")) -> str:
+    """
+    Scrape the content of a website and return the text.
+    """
+    try:
+        content = await FireCrawlClient().scrape_async(url)
+    except Exception as exc:
+        return f"Failed to scrape {url}"
+    return content
+
+
+scrape_website = StructuredTool.from_function(
+    func=scrape, coroutine=ascrape, name="scrape_website"
+)
@@ -0,0 +1,119 @@
+# 按内容寻址的上传文件存储：temp/<sha256>.pdf，引用计数 + TTL 垃圾回收
+import hashlib
+import os
+import re
+import threading
+import time
+from typing import Dict, Optional
+
+_HANDLE_PATTERN = re.compile(r"^[0-9a-f]{64}$")
+
+
+class UploadStore:
+    """
+    Content-addressed storage for uploaded resumes.
+
+    Each upload is stored once as `<root>/<sha256><suffix>`, however many sessions
+    upload it, so sessions never overwrite each other's file. Sessions hold a
+    reference while they use a handle and refresh its lease on every rerun. `gc`
+    removes unreferenced files after `grace` seconds, and referenced files whose
+    lease was not refreshed for `ttl` seconds (the session went away without
+    releasing them).
+
+    Attributes:
+        root (str): Directory holding the stored files.
+        ttl (float): Lease of a referenced file, in seconds.
+        grace (float): Seconds an unreferenced file is kept.
+        suffix (str): File extension of stored files.
+    """
+
+    def __init__(
+        self,
+        root: str = "temp",
+        ttl: Optional[float] = None,
+        grace: Optional[float] = None,
+        suffix: str = ".pdf",
+    ) -> None:
+        self.root = root
+        self.ttl = ttl if ttl is not None else float(os.getenv("UPLOAD_TTL", str(24 * 3600)))
+        self.grace = grace if grace is not None else float(os.getenv("UPLOAD_GRACE", "600"))
+        self.suffix = suffix
+        self._refcounts: Dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    def path(self, handle: str) -> str:
+        return os.path.join(self.root, f"{handle}{self.suffix}")
+
+    def put(self, data: bytes) -> str:
+        """
+        Store the bytes if not already present and return their handle (SHA-256).
+        """
+        handle = hashlib.sha256(data).hexdigest()
+        path = self.path(handle)
+        if not os.path.exists(path):
+            os.makedirs(self.root, exist_ok=True)
+            tmp_path = f"{path}.{threading.get_ident()}.tmp"
+            with open(tmp_path, "wb") as f:
+                f.write(data)
+            os.replace(tmp_path, path)
+        return handle
+
+    def acquire(self, handle: str) -> None:
+        with self._lock:
+            self._refcounts[handle] = self._refcounts.get(handle, 0) + 1
+        self.touch(handle)
+
+    def release(self, handle: str) -> None:
+        with self._lock:
+            count = self._refcounts.get(handle, 0) - 1
+            if count > 0:
+                self._refcounts[handle] = count
+            else:
+                self._refcounts.pop(handle, None)
+
+    def touch(self, handle: str) -> None:
+        """
+        Refresh the lease of a handle that is still in use.
+        """
+        try:
+            os.utime(self.path(handle))
+        except OSError:
+            pass
+
+    def gc(self) -> int:
+        """
+        Delete expired stored files. Returns the number of files removed.
+        """
+        removed = 0
+        now = time.time()
+        try:
+            names = os.listdir(self.root)
+        except OSError:
+            return 0
+        for name in names:
+            handle, suffix = os.path.splitext(name)
+            if suffix != self.suffix or not _HANDLE_PATTERN.match(handle):
+                continue
+            path = self.path(handle)
+            try:
+                with self._lock:
+                    referenced = handle in self._refcounts
+                    if now - os.path.getmtime(path) < (self.ttl if referenced else self.grace):
+                        continue
+                    # 租约过期说明持有引用的会话已经不在了
+                    self._refcounts.pop(handle, None)
+                os.remove(path)
+                removed += 1
+            except OSError:
+                continue
+        return removed
+
+
+_store = UploadStore()
+
+
+def get_upload_store() -> UploadStore:
+    """
+    Return the process-wide UploadStore.
+    """
+    return _store
@@ -47,6 +47,26 @@ class SerperClient:
         response["items"] = items
         return response
 
+    async def search_async(
+        self,
+        query,
+        num_results: int = 5,
+    ):
+        """
+        Asynchronously perform a Google search for the given query and return the search results.
+
+        Args:
+            query (str): The search query.
+            num_results (int, optional): The number of search results to retrieve.
+
+        Returns:
+            dict: The search results as a dictionary.
+        """
+        response = await GoogleSerperAPIWrapper(k=num_results).aresults(query=query)
+        items = response.pop("organic", [])
+        response["items"] = items
+        return response
+
 # 封装网页抓取客户端
 class FireCrawlClient:
 
@@ -66,3 +86,15 @@ class FireCrawlClient:
 
         # limit to 10,000 characters
         return page_content[:10000]
+
+    async def scrape_async(self, url):
+        loader = FireCrawlLoader(api_key=self.firecrawl_api_key, url=url, mode="scrape")
+
+        page_content = ""
+        async for doc in loader.alazy_load():
+            page_content += doc.page_content
+            if len(page_content) >= 10000:
+                break
+
+        # limit to 10,000 characters
+        return page_content[:10000]